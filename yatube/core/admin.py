@@ -0,0 +1,85 @@
+from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from .models import RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """Самые медленные профили запросов, только для чтения."""
+
+    list_display = (
+        'path',
+        'view_name',
+        'user',
+        'mode',
+        'status_code',
+        'duration_ms',
+        'query_count',
+        'db_time_ms',
+        'created',
+    )
+    list_filter = ('view_name', 'mode')
+    list_select_related = ('user',)
+    search_fields = ('path',)
+    ordering = ('-duration_ms',)
+    fields = (
+        'path',
+        'method',
+        'view_name',
+        'user',
+        'mode',
+        'status_code',
+        'duration_ms',
+        'query_count',
+        'db_time_ms',
+        'created',
+        'download',
+        'stats_text',
+        'queries_text',
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/dump/',
+                self.admin_site.admin_view(self.dump_view),
+                name='core_requestprofile_dump',
+            ),
+        ] + super().get_urls()
+
+    def dump_view(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        extension = 'prof' if profile.mode == 'cprofile' else 'folded'
+        response = HttpResponse(
+            bytes(profile.dump), content_type='application/octet-stream'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="profile-{pk}.{extension}"'
+        )
+        return response
+
+    def download(self, obj):
+        return format_html(
+            '<a href="{}">Скачать</a>',
+            reverse('admin:core_requestprofile_dump', args=[obj.pk]),
+        )
+    download.short_description = 'Файл профиля'
+
+    def stats_text(self, obj):
+        return format_html('<pre>{}</pre>', obj.stats)
+    stats_text.short_description = 'Сводка профиля'
+
+    def queries_text(self, obj):
+        return format_html('<pre>{}</pre>', obj.queries)
+    queries_text.short_description = 'SQL-запросы'
@@ -0,0 +1,159 @@
+import asyncio
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ClientDisconnected(Exception):
+    """Клиент закрыл соединение, пока отдавался ответ."""
+
+
+def build_environ(scope, body):
+    """WSGI environ для HTTP-запроса ASGI."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+        environ['REMOTE_PORT'] = str(scope['client'][1])
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin1').lower()
+        value = value.decode('latin1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        if key in environ:
+            value = f'{environ[key]},{value}'
+        environ[key] = value
+    return environ
+
+
+class WsgiToAsgi:
+    """ASGI-приложение поверх WSGI-приложения Django.
+
+    Это только адаптер для запуска под ASGI-сервером: Django 2.2 не
+    умеет асинхронных представлений, и каждый запрос целиком
+    выполняется синхронно в пуле потоков. Одновременных запросов не
+    больше, чем потоков в пуле, как у WSGI-сервера с тем же числом
+    потоков.
+    """
+
+    def __init__(self, wsgi_application, max_workers):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=16)
+        disconnected = threading.Event()
+        future = loop.run_in_executor(
+            self.executor,
+            self.run_wsgi,
+            build_environ(scope, body),
+            loop,
+            queue,
+            disconnected,
+        )
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                await send(message)
+        except BaseException:
+            disconnected.set()
+            while await queue.get() is not None:
+                pass
+            raise
+        finally:
+            await future
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Тело запроса или None, если клиент уже отключился."""
+        body = io.BytesIO()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                return body.getvalue()
+
+    def run_wsgi(self, environ, loop, queue, disconnected):
+        """Выполняет WSGI-приложение в потоке пула и передает части
+        ответа в цикл событий."""
+        response_start = {}
+
+        def put(message):
+            asyncio.run_coroutine_threadsafe(
+                queue.put(message), loop
+            ).result()
+
+        def start_response(status, headers, exc_info=None):
+            response_start.update(
+                type='http.response.start',
+                status=int(status.split(' ', 1)[0]),
+                headers=[
+                    (name.lower().encode('latin1'), value.encode('latin1'))
+                    for name, value in headers
+                ],
+            )
+
+        try:
+            result = self.wsgi_application(environ, start_response)
+            try:
+                put(dict(response_start))
+                for chunk in result:
+                    if disconnected.is_set():
+                        raise ClientDisconnected
+                    if chunk:
+                        put({
+                            'type': 'http.response.body',
+                            'body': chunk,
+                            'more_body': True,
+                        })
+                put({'type': 'http.response.body', 'body': b''})
+            finally:
+                close = getattr(result, 'close', None)
+                if close is not None:
+                    close()
+        finally:
+            put(None)
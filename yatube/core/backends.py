@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+from django.template.backends.jinja2 import Jinja2
+from django.template.base import Template
+from django.test.signals import template_rendered
+from django.test.utils import instrumented_test_render
+from django.utils.module_loading import import_string
+
+from . import metrics
+
+_missing = object()
+
+
+class TimedTemplate:
+    """Шаблон, время рендера которого попадает в метрики запроса."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with metrics.template_timing():
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django с замером времени рендера."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class TimedJinja2Template(TimedTemplate):
+    """Шаблон Jinja2 с замером времени рендера.
+
+    В тестовом окружении, как и шаблоны Django, отправляет
+    template_rendered, поэтому тестовый клиент видит контекст и имя
+    шаблона. Вне тестов сигнал не отправляется.
+    """
+
+    @property
+    def name(self):
+        return self.template.template.name
+
+    def render(self, context=None, request=None):
+        # setup_test_environment() подменяет рендер шаблонов Django
+        # на версию, отправляющую сигнал.
+        if Template._render is instrumented_test_render:
+            template_rendered.send(
+                sender=self, template=self, context=context or {}
+            )
+        return super().render(context, request)
+
+
+class TimedJinja2(Jinja2):
+    """Шаблонизатор Jinja2 с замером времени рендера."""
+
+    def from_string(self, template_code):
+        return TimedJinja2Template(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedJinja2Template(super().get_template(template_name))
+
+
+def template_engine(request):
+    """Шаблонизатор представления: jinja2 для JINJA2_VIEWS, иначе
+    поиск по порядку TEMPLATES."""
+    if metrics.view_label(request) in settings.JINJA2_VIEWS:
+        return 'jinja2'
+    return None
+
+
+class InstrumentedCache:
+    """Считает попадания и промахи кеша в метриках запроса.
+
+    Оборачивает любой бэкенд кеша: его класс задается в
+    OPTIONS['BACKEND'], остальные OPTIONS и параметры кеша передаются
+    ему без изменений. Все методы, кроме get и get_many, вызываются
+    у бэкенда напрямую.
+    """
+
+    def __init__(self, location, params):
+        options = dict(params.get('OPTIONS', {}))
+        backend = import_string(options.pop('BACKEND'))
+        self._cache = backend(location, {**params, 'OPTIONS': options})
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def get(self, key, default=None, version=None):
+        value = self._cache.get(key, _missing, version)
+        if value is _missing:
+            metrics.record_cache(misses=1)
+            return default
+        metrics.record_cache(hits=1)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = self._cache.get_many(keys, version)
+        metrics.record_cache(
+            hits=len(values), misses=len(keys) - len(values)
+        )
+        return values
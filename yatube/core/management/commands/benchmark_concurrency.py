@@ -0,0 +1,174 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WsgiToAsgi, build_environ
+
+
+def make_scope(path, host):
+    path, _, query = path.partition('?')
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'host', host.encode())],
+        'server': (host, 80),
+    }
+
+
+def wsgi_request(application, scope):
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split(' ', 1)[0]))
+
+    result = application(build_environ(scope, b''), start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        result.close()
+    return statuses[0]
+
+
+async def asgi_request(application, scope):
+    statuses = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    await application(scope, receive, send)
+    return statuses[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет накладные расходы ASGI-адаптера: те же запросы '
+        'выполняются напрямую через WSGI и через ASGI с пулом того же '
+        'размера, что и число клиентов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            default=['/'],
+            help='Адреса страниц, по умолчанию главная.',
+        )
+        parser.add_argument(
+            '--clients',
+            type=int,
+            nargs='+',
+            default=[1, 4, 16],
+            help='Числа одновременных клиентов.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Сколько запросов делает каждый клиент.',
+        )
+        parser.add_argument('--host', default='localhost')
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Вывести результаты в JSON.',
+        )
+
+    def run_wsgi(self, application, scopes, clients, requests):
+        def client(number):
+            return [
+                wsgi_request(application, scopes[(number + i) % len(scopes)])
+                for i in range(requests)
+            ]
+
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            return [
+                status
+                for statuses in executor.map(client, range(clients))
+                for status in statuses
+            ]
+
+    def run_asgi(self, application, scopes, clients, requests):
+        async def client(number):
+            return [
+                await asgi_request(
+                    application, scopes[(number + i) % len(scopes)]
+                )
+                for i in range(requests)
+            ]
+
+        async def main():
+            results = await asyncio.gather(
+                *(client(number) for number in range(clients))
+            )
+            return [status for statuses in results for status in statuses]
+
+        return asyncio.run(main())
+
+    def handle(self, *args, **options):
+        scopes = [
+            make_scope(path, options['host']) for path in options['paths']
+        ]
+        wsgi_application = get_wsgi_application()
+        # Прогрев: первый запрос загружает шаблоны и адреса.
+        for scope in scopes:
+            wsgi_request(wsgi_application, scope)
+        results = []
+        for clients in options['clients']:
+            # Оба режима выполняют Django в clients потоках, поэтому
+            # разница показывает только стоимость адаптера.
+            asgi_application = WsgiToAsgi(wsgi_application, clients)
+            modes = {
+                'wsgi': lambda: self.run_wsgi(
+                    wsgi_application, scopes, clients, options['requests']
+                ),
+                'asgi': lambda: self.run_asgi(
+                    asgi_application, scopes, clients, options['requests']
+                ),
+            }
+            seconds_by_mode = {}
+            for mode, run in modes.items():
+                started = time.perf_counter()
+                statuses = run()
+                seconds = time.perf_counter() - started
+                errors = [status for status in statuses if status >= 400]
+                if errors:
+                    raise CommandError(f'{mode}: ответы с ошибкой {errors[0]}')
+                seconds_by_mode[mode] = seconds
+                results.append({
+                    'mode': mode,
+                    'clients': clients,
+                    'requests': len(statuses),
+                    'seconds': round(seconds, 3),
+                    'rps': round(len(statuses) / seconds, 1),
+                })
+            results[-1]['overhead_percent'] = round(
+                (seconds_by_mode['asgi'] / seconds_by_mode['wsgi'] - 1) * 100,
+                1,
+            )
+            asgi_application.executor.shutdown()
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for row in results:
+            line = (
+                '{mode}: клиентов {clients}, запросов {requests}, '
+                '{seconds} с, {rps} запросов/с'.format(**row)
+            )
+            if 'overhead_percent' in row:
+                line += ', накладные расходы {overhead_percent} %'.format(
+                    **row
+                )
+            self.stdout.write(line)
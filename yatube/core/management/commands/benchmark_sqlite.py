@@ -0,0 +1,175 @@
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.test import override_settings
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+ALIAS = 'sqlite_benchmark'
+
+# Прагмы SQLite по умолчанию: журнал отката и полная синхронизация,
+# ожидание блокировки задает timeout модуля sqlite3.
+PROFILES = {
+    'default': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'mmap_size': 0,
+        'cache_size': -2000,
+    },
+}
+
+
+def read(rng, post_ids):
+    list(Post.objects.using(ALIAS).select_related('author', 'group')[:10])
+    list(
+        Comment.objects.using(ALIAS).filter(
+            post_id=rng.choice(post_ids)
+        ).select_related('author')[:10]
+    )
+
+
+def write(rng, post_ids, user_ids):
+    Comment.objects.using(ALIAS).create(
+        post_id=rng.choice(post_ids),
+        author_id=rng.choice(user_ids),
+        text='benchmark',
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность чтений и записей SQLite '
+        'с прагмами по умолчанию и с SQLITE_PRAGMAS на копии БД.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients',
+            type=int,
+            nargs='+',
+            default=[1, 4, 16],
+            help='Числа одновременных клиентов.',
+        )
+        parser.add_argument(
+            '--operations',
+            type=int,
+            default=200,
+            help='Сколько операций делает каждый клиент.',
+        )
+        parser.add_argument(
+            '--write-ratio',
+            type=float,
+            default=0.2,
+            help='Доля записей среди операций.',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Вывести результаты в JSON.',
+        )
+
+    def copy_database(self, path):
+        """Копирует основную БД в файл, в том числе БД в памяти."""
+        connection = connections['default']
+        connection.ensure_connection()
+        with sqlite3.connect(path) as target:
+            connection.connection.backup(target)
+
+    def run_profile(self, clients, operations, write_ratio, ids):
+        post_ids, user_ids = ids
+        # Режим журнала меняется только без других соединений.
+        connections[ALIAS].ensure_connection()
+        connections[ALIAS].close()
+
+        def client(number):
+            rng = random.Random(number)
+            counts = {'reads': 0, 'writes': 0, 'locked': 0}
+            try:
+                for _ in range(operations):
+                    is_write = rng.random() < write_ratio
+                    try:
+                        if is_write:
+                            write(rng, post_ids, user_ids)
+                        else:
+                            read(rng, post_ids)
+                    except OperationalError:
+                        counts['locked'] += 1
+                    else:
+                        counts['writes' if is_write else 'reads'] += 1
+            finally:
+                connections[ALIAS].close()
+            return counts
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            results = list(executor.map(client, range(clients)))
+        seconds = time.perf_counter() - started
+        totals = {
+            name: sum(result[name] for result in results)
+            for name in ('reads', 'writes', 'locked')
+        }
+        return {
+            'clients': clients,
+            'seconds': round(seconds, 3),
+            'reads_per_second': round(totals['reads'] / seconds, 1),
+            'writes_per_second': round(totals['writes'] / seconds, 1),
+            'locked': totals['locked'],
+        }
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('Основная БД не SQLite.')
+        ids = (
+            list(Post.objects.values_list('pk', flat=True)[:10000]),
+            list(User.objects.values_list('pk', flat=True)[:1000]),
+        )
+        if not ids[0]:
+            raise CommandError('В БД нет постов, запустите seed_benchmark.')
+        profiles = dict(PROFILES, tuned=settings.SQLITE_PRAGMAS)
+        handle, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.databases[ALIAS] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+        }
+        results = []
+        try:
+            for profile, pragmas in profiles.items():
+                self.copy_database(path)
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    for clients in options['clients']:
+                        row = self.run_profile(
+                            clients,
+                            options['operations'],
+                            options['write_ratio'],
+                            ids,
+                        )
+                        results.append(dict(row, profile=profile))
+        finally:
+            connections[ALIAS].close()
+            del connections.databases[ALIAS]
+            del connections[ALIAS]
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for row in results:
+            self.stdout.write(
+                '{profile}: клиентов {clients}, чтений {reads_per_second}/с, '
+                'записей {writes_per_second}/с, блокировок {locked}'.format(
+                    **row
+                )
+            )
@@ -0,0 +1,177 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+TIME_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+HISTOGRAMS = {
+    'total_ms': TIME_BUCKETS,
+    'db_ms': TIME_BUCKETS,
+    'template_ms': TIME_BUCKETS,
+    'queries': COUNT_BUCKETS,
+    'cache_misses': COUNT_BUCKETS,
+}
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Счетчики одного запроса."""
+
+    __slots__ = (
+        'started', 'queries', 'db_time', 'template_time', 'cache_hits',
+        'cache_misses', 'render_depth',
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.render_depth = 0
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing."""
+        return ', '.join((
+            'db;dur={:.1f};desc="{} queries"'.format(
+                self.db_time * 1000, self.queries
+            ),
+            'tpl;dur={:.1f}'.format(self.template_time * 1000),
+            'cache;desc="hits={} misses={}"'.format(
+                self.cache_hits, self.cache_misses
+            ),
+            'total;dur={:.1f}'.format(self.total_time * 1000),
+        ))
+
+
+def start():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def record_query(duration):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.queries += 1
+        metrics.db_time += duration
+
+
+def record_cache(hits=0, misses=0):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+@contextmanager
+def template_timing():
+    """Считает время рендера шаблона верхнего уровня.
+
+    Вложенные шаблоны, например фрагменты постов, уже входят во время
+    внешнего шаблона и не учитываются второй раз.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    metrics.render_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.render_depth -= 1
+        if not metrics.render_depth:
+            metrics.template_time += time.perf_counter() - started
+
+
+def view_label(request):
+    """Имя представления по app_name, например posts:index."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    if match.url_name is None:
+        # Безымянный адрес подписывается путем к представлению.
+        func = match.func
+        if not hasattr(func, '__qualname__'):
+            func = type(func)
+        return f'{func.__module__}.{func.__qualname__}'
+    return ':'.join(match.app_names + [match.url_name])
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self):
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'buckets': dict(zip(bounds, self.counts)),
+        }
+
+
+_histograms = defaultdict(
+    lambda: {name: Histogram(buckets) for name, buckets in HISTOGRAMS.items()}
+)
+_lock = threading.Lock()
+
+
+def observe(view_name, metrics):
+    """Добавляет метрики запроса в гистограммы представления."""
+    values = {
+        'total_ms': metrics.total_time * 1000,
+        'db_ms': metrics.db_time * 1000,
+        'template_ms': metrics.template_time * 1000,
+        'queries': metrics.queries,
+        'cache_misses': metrics.cache_misses,
+    }
+    with _lock:
+        histograms = _histograms[view_name]
+        for name, value in values.items():
+            histograms[name].observe(value)
+
+
+def snapshot():
+    """Гистограммы всех представлений этого процесса."""
+    with _lock:
+        return {
+            view_name: {
+                name: histogram.as_dict()
+                for name, histogram in histograms.items()
+            }
+            for view_name, histograms in _histograms.items()
+        }
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
@@ -0,0 +1,107 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, profiler, routers
+
+
+def _timed_execute(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(time.perf_counter() - started)
+
+
+class RequestMetricsMiddleware:
+    """Считает запросы к БД, время БД и шаблонов и обращения к кешу.
+
+    Итог отдается в заголовке Server-Timing и копится в гистограммах
+    по представлениям. Замер стоит два вызова perf_counter на запрос
+    к БД, поэтому middleware можно держать включенным всегда.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics, token = metrics.start()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(_timed_execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.finish(token)
+        metrics.observe(metrics.view_label(request), request_metrics)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = request_metrics.server_timing()
+        return response
+
+
+class ProfilerMiddleware:
+    """Профилирует запрос, если его попросил сотрудник.
+
+    Профилировщик включается заголовком X-Profile или параметром
+    ?_profile= со значением cprofile или sample. Профиль с SQL
+    сохраняется в RequestProfile, его номер отдается в X-Profile-Id.
+    Профилируемый запрос не берется из кеша страниц и не получает 304.
+    Стоит после AuthenticationMiddleware, чтобы проверить is_staff.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = profiler.requested_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        request._profiled = True
+        response, profile = profiler.profile_request(
+            mode, self.get_response, request
+        )
+        profiler.save(profile)
+        response['X-Profile-Id'] = profile.pk
+        return response
+
+
+class ReplicaMiddleware:
+    """Отправляет чтения представлений из REPLICA_VIEWS на реплики.
+
+    Клиент, который только что писал в базу из представления
+    REPLICA_PIN_VIEWS, на REPLICA_PIN_SECONDS закрепляется за основной
+    базой через cookie, пока реплики догоняют его изменения.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        route, token = routers.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.finish(token)
+        if (
+            route.wrote
+            and settings.REPLICA_DATABASES
+            and metrics.view_label(request) in settings.REPLICA_PIN_VIEWS
+        ):
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in ('GET', 'HEAD')
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+            and metrics.view_label(request) in settings.REPLICA_VIEWS
+        ):
+            routers.use_replica()
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.6 on 2026-10-18 17:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.TextField(verbose_name='Адрес')),
+                ('view_name', models.CharField(max_length=200, verbose_name='Представление')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Статус')),
+                ('mode', models.CharField(choices=[('cprofile', 'cProfile'), ('sample', 'Сэмплирование стеков')], max_length=10, verbose_name='Профилировщик')),
+                ('duration_ms', models.FloatField(db_index=True, verbose_name='Длительность, мс')),
+                ('query_count', models.PositiveIntegerField(verbose_name='Запросов к БД')),
+                ('db_time_ms', models.FloatField(verbose_name='Время БД, мс')),
+                ('stats', models.TextField(verbose_name='Сводка профиля')),
+                ('queries', models.TextField(verbose_name='SQL-запросы')),
+                ('dump', models.BinaryField(verbose_name='Файл профиля')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ['-duration_ms'],
+            },
+        ),
+    ]
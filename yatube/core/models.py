@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    """Модель профиля одного запроса, снятого по запросу персонала."""
+
+    MODES = (
+        ('cprofile', 'cProfile'),
+        ('sample', 'Сэмплирование стеков'),
+    )
+
+    created = models.DateTimeField(
+        verbose_name='Дата',
+        auto_now_add=True,
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+        verbose_name='Пользователь',
+    )
+    method = models.CharField(max_length=10, verbose_name='Метод')
+    path = models.TextField(verbose_name='Адрес')
+    view_name = models.CharField(max_length=200, verbose_name='Представление')
+    status_code = models.PositiveSmallIntegerField(verbose_name='Статус')
+    mode = models.CharField(
+        max_length=10,
+        choices=MODES,
+        verbose_name='Профилировщик',
+    )
+    duration_ms = models.FloatField(
+        verbose_name='Длительность, мс',
+        db_index=True,
+    )
+    query_count = models.PositiveIntegerField(verbose_name='Запросов к БД')
+    db_time_ms = models.FloatField(verbose_name='Время БД, мс')
+    stats = models.TextField(verbose_name='Сводка профиля')
+    queries = models.TextField(verbose_name='SQL-запросы')
+    dump = models.BinaryField(verbose_name='Файл профиля')
+
+    class Meta:
+        ordering = ['-duration_ms']
+        verbose_name_plural = 'Профили запросов'
+        verbose_name = 'Профиль запроса'
+
+    def __str__(self):
+        return f'{self.method} {self.path} {self.duration_ms:.0f} мс'
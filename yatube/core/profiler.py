@@ -0,0 +1,161 @@
+import cProfile
+import io
+import json
+import marshal
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import view_label
+from .models import RequestProfile
+
+MODES = ('cprofile', 'sample')
+QUERY_PARAM = '_profile'
+HEADER = 'HTTP_X_PROFILE'
+
+
+def requested_mode(request):
+    """Режим профилирования, запрошенный персоналом, или None."""
+    value = request.META.get(HEADER) or request.GET.get(QUERY_PARAM)
+    if not value:
+        return None
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_staff:
+        return None
+    return value if value in MODES else 'cprofile'
+
+
+def is_profiled(request):
+    """Профилируется ли запрос.
+
+    Такие запросы идут мимо кеша страниц и ответов 304, иначе профиль
+    покажет чтение из кеша, а не работу представления.
+    """
+    return getattr(request, '_profiled', False)
+
+
+class StackSampler:
+    """Сэмплирующий профилировщик: фоновый поток снимает стек
+    профилируемого потока каждые interval секунд."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.thread_id = threading.get_ident()
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{code.co_name} ({code.co_filename}:{frame.f_lineno})'
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.sampler.join()
+
+    def collapsed(self):
+        """Стеки в формате collapsed для flamegraph."""
+        return '\n'.join(
+            f'{stack} {count}' for stack, count in self.stacks.most_common()
+        )
+
+    def summary(self, lines):
+        """Функции, чаще всего оказывавшиеся на вершине стека."""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return '\n'.join(
+            f'{count * 100 / total:5.1f}% {count:6d} {frame}'
+            for frame, count in leaves.most_common(lines)
+        )
+
+
+@contextmanager
+def capture_queries(queries):
+    """Собирает SQL и время каждого запроса ко всем БД."""
+    def execute_wrapper(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            queries.append({
+                'sql': sql,
+                'params': None if many else repr(params),
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+            })
+
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(
+                connections[alias].execute_wrapper(execute_wrapper)
+            )
+        yield
+
+
+def profile_request(mode, get_response, request):
+    """Выполняет запрос под профилировщиком и возвращает ответ
+    и несохраненный RequestProfile."""
+    queries = []
+    started = time.perf_counter()
+    with capture_queries(queries):
+        if mode == 'sample':
+            with StackSampler(settings.PROFILER_SAMPLE_INTERVAL) as sampler:
+                response = get_response(request)
+            stats = sampler.summary(settings.PROFILER_STATS_LINES)
+            dump = sampler.collapsed().encode()
+        else:
+            profiler = cProfile.Profile()
+            response = profiler.runcall(get_response, request)
+            output = io.StringIO()
+            profile_stats = pstats.Stats(profiler, stream=output)
+            profile_stats.sort_stats('cumulative').print_stats(
+                settings.PROFILER_STATS_LINES
+            )
+            stats = output.getvalue()
+            dump = marshal.dumps(profile_stats.stats)
+    duration = time.perf_counter() - started
+    profile = RequestProfile(
+        user=request.user if request.user.is_authenticated else None,
+        method=request.method,
+        path=request.get_full_path(),
+        view_name=view_label(request),
+        status_code=response.status_code,
+        mode=mode,
+        duration_ms=duration * 1000,
+        query_count=len(queries),
+        db_time_ms=sum(query['ms'] for query in queries),
+        stats=stats,
+        queries=json.dumps(queries, ensure_ascii=False, indent=2),
+        dump=dump,
+    )
+    return response, profile
+
+
+def save(profile):
+    """Сохраняет профиль и оставляет только PROFILER_KEEP самых
+    медленных."""
+    profile.save()
+    slowest = RequestProfile.objects.order_by(
+        '-duration_ms'
+    ).values_list('pk', flat=True)[:settings.PROFILER_KEEP]
+    RequestProfile.objects.exclude(pk__in=list(slowest)).delete()
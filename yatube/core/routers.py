@@ -0,0 +1,68 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_route = ContextVar('db_route', default=None)
+
+
+class Route:
+    """Выбор базы для чтения в рамках одного запроса."""
+
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+def start():
+    route = Route()
+    return route, _route.set(route)
+
+
+def finish(token):
+    _route.reset(token)
+
+
+def replica_routed():
+    """Направлены ли чтения текущего запроса на реплику."""
+    route = _route.get()
+    return route is not None and route.replica is not None and not route.wrote
+
+
+def use_replica():
+    """Направляет чтения текущего запроса на случайную реплику."""
+    route = _route.get()
+    if route is not None and settings.REPLICA_DATABASES:
+        route.replica = random.choice(settings.REPLICA_DATABASES)
+
+
+class ReplicaRouter:
+    """Чтения отмеченных запросов идут на реплику, записи на основную.
+
+    После первой записи в запросе чтения возвращаются на основную
+    базу, чтобы запрос видел собственные изменения. Модели из
+    REPLICA_PRIMARY_MODELS всегда читаются из основной базы.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not replica_routed():
+            return None
+        meta = model._meta
+        primary = settings.REPLICA_PRIMARY_MODELS
+        if meta.app_label in primary or meta.label_lower in primary:
+            return None
+        return _route.get().replica
+
+    def db_for_write(self, model, **hints):
+        route = _route.get()
+        if route is not None:
+            route.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.REPLICA_DATABASES
@@ -0,0 +1,407 @@
+import asyncio
+import json
+import marshal
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import (Client, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from django.urls import reverse
+
+from core import metrics
+from core.asgi import WsgiToAsgi
+from core.backends import InstrumentedCache
+from core.models import RequestProfile
+from posts.cache import feed_stats
+from posts.models import Post
+
+User = get_user_model()
+
+
+def run_asgi(application, path, method='GET', body=b'', headers=()):
+    """Выполняет запрос к ASGI-приложению и собирает ответ."""
+    messages = []
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': b'',
+        'headers': [(b'host', b'testserver'), *headers],
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': body}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    start = messages[0]
+    content = b''.join(message.get('body', b'') for message in messages[1:])
+    return start['status'], dict(start['headers']), content
+
+
+class WsgiToAsgiTests(SimpleTestCase):
+    def test_django_page(self):
+        """Страница Django отдается через ASGI."""
+        application = WsgiToAsgi(get_wsgi_application(), 2)
+        status, headers, content = run_asgi(application, '/about/author/')
+        self.assertEqual(status, 200)
+        self.assertIn(b'text/html', headers[b'content-type'])
+        self.assertTrue(content)
+
+    def test_request_and_streaming_response(self):
+        """Тело запроса передается приложению, ответ отдается частями."""
+        def wsgi_application(environ, start_response):
+            body = environ['wsgi.input'].read()
+            start_response(
+                '201 Created', [('X-Method', environ['REQUEST_METHOD'])]
+            )
+            return iter([b'got:', body, b'', b'!'])
+
+        status, headers, content = run_asgi(
+            WsgiToAsgi(wsgi_application, 1),
+            '/',
+            method='POST',
+            body=b'data',
+            headers=[(b'content-type', b'text/plain')],
+        )
+        self.assertEqual(status, 201)
+        self.assertEqual(headers[b'x-method'], b'POST')
+        self.assertEqual(content, b'got:data!')
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def server_timing(self, response):
+        return dict(
+            re.findall(r'(\w+);(?:dur=([\d.]+))?', response['Server-Timing'])
+        )
+
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing(self):
+        """Ответ содержит время БД, шаблонов, кеш и число запросов."""
+        response = Client().get(reverse('posts:index'))
+        header = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, header)
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(header, r'misses=[1-9]')
+        self.assertGreater(float(self.server_timing(response)['tpl']), 0)
+        response = Client().get(reverse('posts:index'))
+        self.assertRegex(response['Server-Timing'], r'hits=[1-9]')
+
+    def test_cache_wrapper_backend_agnostic(self):
+        """Обертка кеша считает обращения для любого бэкенда."""
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        file_cache = InstrumentedCache(location, {'OPTIONS': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        }})
+        request_metrics, token = metrics.start()
+        try:
+            file_cache.set('key', 'value')
+            self.assertEqual(file_cache.get('key'), 'value')
+            self.assertIsNone(file_cache.get('missing'))
+            file_cache.get_many(['key', 'missing'])
+        finally:
+            metrics.finish(token)
+        self.assertEqual(request_metrics.cache_hits, 2)
+        self.assertEqual(request_metrics.cache_misses, 2)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        """Заголовок отключается настройкой SERVER_TIMING."""
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_histograms(self):
+        """Метрики копятся по представлениям и доступны персоналу."""
+        Client().get(reverse('posts:index'))
+        Client().get(reverse('posts:index'))
+        histograms = metrics.snapshot()['posts:index']
+        self.assertEqual(histograms['total_ms']['count'], 2)
+        self.assertEqual(
+            sum(histograms['queries']['buckets'].values()), 2
+        )
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        client = Client()
+        response = client.get(reverse('request_metrics'))
+        self.assertEqual(response.status_code, 302)
+        client.force_login(staff)
+        response = client.get(reverse('request_metrics'))
+        self.assertIn('posts:index', response.json())
+
+
+class ProfilerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+        Post.objects.create(text='Тестовый текст', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_only_staff_can_profile(self):
+        """Профиль снимается только по запросу сотрудника."""
+        client = Client()
+        client.force_login(self.user)
+        for current in (Client(), client):
+            with self.subTest(client=current):
+                response = current.get(
+                    reverse('posts:index'), HTTP_X_PROFILE='1'
+                )
+                self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_cprofile_with_queries(self):
+        """cProfile сохраняет pstats, сводку и SQL запроса."""
+        response = self.staff_client.get(
+            reverse('posts:profile', args=[self.user.username]),
+            HTTP_X_PROFILE='1',
+        )
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual(profile.user, self.staff)
+        self.assertEqual(profile.view_name, 'posts:profile')
+        self.assertEqual(profile.mode, 'cprofile')
+        self.assertEqual(profile.status_code, 200)
+        self.assertIn('cumulative', profile.stats)
+        stats = marshal.loads(bytes(profile.dump))
+        self.assertTrue(
+            any(function == 'profile' for _, _, function in stats)
+        )
+        queries = json.loads(profile.queries)
+        self.assertEqual(len(queries), profile.query_count)
+        self.assertTrue(
+            any('"posts_post"' in query['sql'] for query in queries)
+        )
+
+    def test_profile_bypasses_page_cache(self):
+        """Профилируемый запрос не берется из кеша страниц и не получает
+        ответ 304."""
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.user.username]),
+        ):
+            with self.subTest(url=url):
+                etag = self.staff_client.get(url).get('ETag', '')
+                response = self.staff_client.get(
+                    url, HTTP_X_PROFILE='1', HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+                profile = RequestProfile.objects.get(
+                    pk=response['X-Profile-Id']
+                )
+                queries = json.loads(profile.queries)
+                self.assertTrue(
+                    any('"posts_post"' in query['sql'] for query in queries)
+                )
+
+    @override_settings(PROFILER_SAMPLE_INTERVAL=0.0005)
+    def test_sampling_profiler(self):
+        """Сэмплирующий профилировщик включается параметром запроса."""
+        response = self.staff_client.get(
+            reverse('posts:index'), {'_profile': 'sample'}
+        )
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual(profile.mode, 'sample')
+        self.assertEqual(profile.path, '/?_profile=sample')
+        for line in bytes(profile.dump).decode().splitlines():
+            with self.subTest(line=line):
+                self.assertRegex(line, r' \d+$')
+
+    @override_settings(PROFILER_KEEP=2)
+    def test_keeps_slowest(self):
+        """Хранятся только PROFILER_KEEP самых медленных профилей."""
+        for duration in (5, 1, 3):
+            RequestProfile.objects.create(
+                method='GET', path='/', view_name='posts:index',
+                status_code=200, mode='cprofile', duration_ms=duration,
+                query_count=0, db_time_ms=0, stats='', queries='[]',
+                dump=b'',
+            )
+        self.staff_client.get(reverse('posts:index'), HTTP_X_PROFILE='1')
+        durations = list(
+            RequestProfile.objects.values_list('duration_ms', flat=True)
+        )
+        self.assertEqual(len(durations), 2)
+        self.assertEqual(durations, sorted(durations, reverse=True))
+        self.assertGreaterEqual(durations[-1], 3)
+
+    def test_admin(self):
+        """Профили видны в админке, дамп можно скачать."""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(reverse('posts:index'), HTTP_X_PROFILE='1')
+        pk = response['X-Profile-Id']
+        response = client.get(
+            reverse('admin:core_requestprofile_changelist')
+        )
+        self.assertContains(response, 'posts:index')
+        response = client.get(
+            reverse('admin:core_requestprofile_change', args=[pk])
+        )
+        self.assertContains(response, 'cumulative')
+        response = client.get(
+            reverse('admin:core_requestprofile_dump', args=[pk])
+        )
+        self.assertIn('.prof', response['Content-Disposition'])
+        marshal.loads(response.content)
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        handle, cls.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.databases['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': cls.replica_path,
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections.databases['replica']
+        del connections['replica']
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(cls.replica_path + suffix):
+                os.remove(cls.replica_path + suffix)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(text='Старый пост', author=self.author)
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.copy_replica()
+
+    def copy_replica(self):
+        """Реплика — копия основной базы на момент вызова."""
+        connections['replica'].close()
+        connection = connections['default']
+        connection.ensure_connection()
+        with sqlite3.connect(self.replica_path) as replica:
+            connection.connection.backup(replica)
+
+    def index_texts(self):
+        response = self.client.get(reverse('posts:index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_read_views_use_replica(self):
+        """Представления для чтения не видят записей после копии."""
+        Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(self.index_texts(), ['Старый пост'])
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertEqual(len(response.context['page_obj']), 1)
+
+    def test_other_views_use_primary(self):
+        """Страницы вне REPLICA_VIEWS читают из основной базы."""
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.client.get(reverse('posts:edit', args=[self.post.pk]))
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('posts:post_create'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('primary_pin', response.cookies)
+
+    def test_read_your_writes(self):
+        """После записи клиент читает из основной базы."""
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}
+        )
+        self.assertIn('primary_pin', response.cookies)
+        self.assertEqual(self.index_texts(), ['Новый пост', 'Старый пост'])
+        self.client.cookies.pop('primary_pin')
+        cache.clear()
+        self.assertEqual(self.index_texts(), ['Старый пост'])
+
+    def test_service_writes_do_not_pin(self):
+        """Вход пишет сессию и last_login, но не закрепляет клиента."""
+        User.objects.create_user(username='reader', password='secret')
+        self.copy_replica()
+        response = Client().post(
+            reverse('users:login'),
+            {'username': 'reader', 'password': 'secret'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('primary_pin', response.cookies)
+
+    def test_replica_pages_cached_separately(self):
+        """Страницы лент с реплики кешируются под своим ключом."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(feed_stats()['hits'], 1)
+        self.assertEqual(feed_stats()['regenerations'], 1)
+        self.client.cookies['primary_pin'] = '1'
+        self.client.get(url)
+        self.assertEqual(feed_stats()['regenerations'], 2)
+
+    def test_login_then_replica_view(self):
+        """Сессия нового входа читается из основной базы, даже когда
+        представление читает посты с реплики."""
+        User.objects.create_user(username='reader', password='secret')
+        self.copy_replica()
+        client = Client()
+        client.post(
+            reverse('users:login'),
+            {'username': 'reader', 'password': 'secret'},
+        )
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 200)
+
+
+class SqliteSettingsTests(TransactionTestCase):
+    def test_pragmas_applied(self):
+        """Каждое соединение с SQLite получает прагмы из настроек."""
+        with connections['default'].cursor() as cursor:
+            for name, expected in (('synchronous', 1),
+                                   ('cache_size', -64 * 1024),
+                                   ('busy_timeout', 5000)):
+                with self.subTest(pragma=name):
+                    cursor.execute(f'PRAGMA {name}')
+                    self.assertEqual(cursor.fetchone()[0], expected)
+
+    def test_benchmark_command(self):
+        """Бенчмарк сравнивает прагмы по умолчанию и настроенные."""
+        author = User.objects.create_user(username='author')
+        Post.objects.create(text='Пост', author=author)
+        output = StringIO()
+        call_command(
+            'benchmark_sqlite', '--clients', '1', '2', '--operations', '10',
+            '--json', stdout=output,
+        )
+        results = json.loads(output.getvalue())
+        self.assertEqual(
+            [(row['profile'], row['clients']) for row in results],
+            [('default', 1), ('default', 2), ('tuned', 1), ('tuned', 2)],
+        )
+        for row in results:
+            with self.subTest(profile=row['profile'], clients=row['clients']):
+                self.assertGreater(row['reads_per_second'], 0)
+                self.assertEqual(row['locked'], 0)
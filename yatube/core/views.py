@@ -1,7 +1,11 @@
 from http import HTTPStatus
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import metrics
+
 
 def page_not_found(request, exception):
     return render(
@@ -33,3 +37,11 @@ def permission_denied(request, exception):
         'core/403.html',
         status=HTTPStatus.FORBIDDEN
     )
+
+
+@staff_member_required
+def request_metrics(request):
+    """Гистограммы метрик запросов по представлениям."""
+    return JsonResponse(
+        metrics.snapshot(), json_dumps_params={'ensure_ascii': False}
+    )
@@ -1,6 +1,42 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, SEARCH_VAR
+from django.contrib.admin.widgets import AutocompleteSelect
 
+from . import search
 from .models import Comment, Group, Post
+from .utils import EstimatedCountPaginator
+
+
+class LoadedAutocompleteSelect(AutocompleteSelect):
+    """Автокомплит, который не загружает уже известную группу заново."""
+
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        selected = self.selected
+        if selected is None or [str(v) for v in value] != [str(selected.pk)]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(
+            self.create_option(
+                name, selected.pk, str(selected), True, len(options)
+            )
+        )
+        return [(None, options, 0)]
+
+
+class PostChangeListForm(forms.ModelForm):
+    """Строка списка постов с группой из list_select_related."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        widget = self.fields['group'].widget
+        widget = getattr(widget, 'widget', widget)
+        if isinstance(widget, LoadedAutocompleteSelect):
+            widget.selected = self.instance.group
 
 
 @admin.register(Post)
@@ -13,10 +49,43 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('group',)
+    raw_id_fields = ('author',)
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет посты через поисковый индекс вместо LIKE по тексту."""
+        if not search_term:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return search.filter_posts(queryset, search_term), False
+
+    def get_ordering(self, request):
+        """При поиске без выбранной сортировки лучшие совпадения
+        идут первыми."""
+        if request.GET.get(SEARCH_VAR) and ORDER_VAR not in request.GET:
+            return ('-search_rank',)
+        return super().get_ordering(request)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'group':
+            kwargs['widget'] = LoadedAutocompleteSelect(
+                db_field.remote_field,
+                self.admin_site,
+                using=kwargs.get('using'),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', PostChangeListForm)
+        return super().get_changelist_form(request, **kwargs)
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
@@ -28,6 +97,8 @@ class GroupAdmin(admin.ModelAdmin):
     )
     list_editable = ('description', 'title', 'slug')
     search_fields = ('title',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
@@ -39,5 +110,9 @@ class СommentsAdmin(admin.ModelAdmin):
         'author',
         'created'
     )
-    list_filter = ('created',)
+    list_select_related = ('author',)
+    raw_id_fields = ('post', 'author')
+    date_hierarchy = 'created'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
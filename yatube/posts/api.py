@@ -0,0 +1,134 @@
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, quote_etag
+
+from .cache import get_versions
+from .models import Group, Post
+from .timeline import follow_source
+from .utils import CursorPaginator, get_cursor_page
+
+User = get_user_model()
+
+POST_FIELDS = (
+    'text',
+    'pub_date',
+    'author_id',
+    'author__username',
+    'group_id',
+    'group__slug',
+    'image',
+)
+
+
+def serialize(row, id_field, prefix):
+    return {
+        'id': row[id_field],
+        'text': row[f'{prefix}text'],
+        'pub_date': row['pub_date'],
+        'author': row[f'{prefix}author__username'],
+        'group': row[f'{prefix}group__slug'],
+        'image': (
+            default_storage.url(row[f'{prefix}image'])
+            if row[f'{prefix}image'] else None
+        ),
+    }
+
+
+def page_etag(rows, id_field, prefix, request):
+    """Сильный ETag страницы по id, датам и версиям постов.
+
+    Версии постов, авторов и групп меняются сигналами при
+    редактировании, поэтому правка поста тоже меняет ETag.
+    """
+    objects = []
+    for row in rows:
+        objects.append(('post', row[id_field]))
+        objects.append(('user', row[f'{prefix}author_id']))
+        if row[f'{prefix}group_id']:
+            objects.append(('group', row[f'{prefix}group_id']))
+    digest = hashlib.md5(request.get_full_path().encode())
+    for row in rows:
+        digest.update(
+            '{}|{};'.format(row[id_field], row['pub_date'].isoformat())
+            .encode()
+        )
+    digest.update(':'.join(get_versions(*objects)).encode())
+    return quote_etag(digest.hexdigest())
+
+
+def page_url(request, param, cursor):
+    if cursor is None:
+        return None
+    return request.build_absolute_uri(f'{request.path}?{param}={cursor}')
+
+
+def feed_response(request, queryset, fields=('pub_date', 'id'), prefix='',
+                  paginator_class=CursorPaginator):
+    """Страница ленты в JSON с курсорами и ответом 304 по ETag.
+
+    Посты читаются через values() без объектов моделей и шаблонов,
+    а при совпавшем ETag не сериализуются совсем.
+    """
+    date_field, id_field = fields
+    queryset = queryset.values(
+        id_field, *(
+            field if field == date_field else f'{prefix}{field}'
+            for field in POST_FIELDS
+        )
+    )
+    page_obj = get_cursor_page(
+        queryset, request, fields, paginator_class=paginator_class
+    )
+    etag = page_etag(page_obj.object_list, id_field, prefix, request)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(
+            {
+                'results': [
+                    serialize(row, id_field, prefix) for row in page_obj
+                ],
+                'next': page_url(request, 'after', page_obj.next_cursor),
+                'previous': page_url(
+                    request, 'before', page_obj.previous_cursor
+                ),
+            },
+            encoder=DjangoJSONEncoder,
+            json_dumps_params={
+                'ensure_ascii': False,
+                'separators': (',', ':'),
+            },
+        )
+    response['ETag'] = etag
+    return response
+
+
+def index(request):
+    """Главная лента в JSON."""
+    return feed_response(request, Post.objects.all())
+
+
+def group_posts(request, slug):
+    """Лента группы в JSON."""
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(request, group.posts.all())
+
+
+def profile(request, username):
+    """Посты автора в JSON."""
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, author.posts.all())
+
+
+def follow_index(request):
+    """Лента подписок в JSON."""
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Требуется авторизация.'}, status=401
+        )
+    queryset, fields, prefix, paginator_class = follow_source(request.user)
+    return feed_response(request, queryset, fields, prefix, paginator_class)
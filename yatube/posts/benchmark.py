@@ -0,0 +1,333 @@
+import itertools
+import json
+import math
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+
+import django
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from faker import Faker
+
+from . import importer, urls
+from .models import Comment, Follow, Group, Post, UserStats
+from .utils import bulk_batch_size
+
+User = get_user_model()
+
+BENCHMARK_USERNAME = 'benchmark'
+
+URL_PARAMS = {
+    'search': {'q': 'и'},
+    'export_posts': {'since': '{recent}'},
+}
+
+
+class Sampler:
+    """Выбирает id с распределением Ципфа: немногие популярные
+    авторы получают большую часть подписок и постов."""
+
+    def __init__(self, ids, skew, rng):
+        self.ids = list(ids)
+        rng.shuffle(self.ids)
+        self.cum_weights = list(itertools.accumulate(
+            1 / (rank + 1) ** skew for rank in range(len(self.ids))
+        ))
+        self.rng = rng
+
+    def sample(self, k):
+        return self.rng.choices(self.ids, cum_weights=self.cum_weights, k=k)
+
+
+def _batches(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield start, min(batch_size, total - start)
+
+
+def seed(users, posts, groups=20, follows=20, comments=0, skew=1.1,
+         days=365, batch_size=5000, random_seed=42, report=None):
+    """Заполняет БД синтетическими данными для замеров.
+
+    Данные воспроизводимы при одном random_seed. Подписки и авторство
+    постов распределены по Ципфу с показателем skew. Производные
+    данные пересобираются один раз в конце.
+    """
+    rng = random.Random(random_seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(random_seed)
+    sentences = [fake.sentence(nb_words=8) for _ in range(1000)]
+    now = timezone.now()
+    started = time.monotonic()
+
+    def progress(name, done):
+        if report:
+            report(name, done, time.monotonic() - started)
+
+    with transaction.atomic():
+        Group.objects.bulk_create(
+            Group(
+                title=fake.catch_phrase()[:200],
+                slug=f'group-{number}',
+                description=fake.paragraph(),
+            )
+            for number in range(groups)
+        )
+        User.objects.bulk_create(
+            [User(username=BENCHMARK_USERNAME, password='!', is_staff=True)],
+            ignore_conflicts=True,
+        )
+    first_user = (User.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+    for start, size in _batches(users, batch_size):
+        with transaction.atomic():
+            User.objects.bulk_create(
+                User(
+                    username=f'{fake.user_name()}{first_user + start + i}',
+                    first_name=fake.first_name(),
+                    last_name=fake.last_name(),
+                    password='!',
+                )
+                for i in range(size)
+            )
+        progress('users', start + size)
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    group_ids = list(Group.objects.values_list('pk', flat=True))
+    authors = Sampler(user_ids, skew, rng)
+
+    for start, size in _batches(posts, batch_size):
+        with transaction.atomic():
+            Post.objects.bulk_create(
+                Post(
+                    author_id=author_id,
+                    group_id=(
+                        rng.choice(group_ids)
+                        if group_ids and rng.random() < 0.5 else None
+                    ),
+                    text=' '.join(rng.sample(sentences, 3)),
+                    pub_date=now - timedelta(
+                        seconds=rng.randrange(days * 24 * 60 * 60)
+                    ),
+                )
+                for author_id in authors.sample(size)
+            )
+        progress('posts', start + size)
+    if comments:
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        for start, size in _batches(comments, batch_size):
+            with transaction.atomic():
+                Comment.objects.bulk_create(
+                    Comment(
+                        post_id=rng.choice(post_ids),
+                        author_id=rng.choice(user_ids),
+                        text=rng.choice(sentences),
+                        created=now - timedelta(
+                            seconds=rng.randrange(days * 24 * 60 * 60)
+                        ),
+                    )
+                    for _ in range(size)
+                )
+            progress('comments', start + size)
+
+    for start, size in _batches(len(user_ids), batch_size):
+        rows = []
+        for user_id in user_ids[start:start + size]:
+            targets = set(authors.sample(follows))
+            targets.discard(user_id)
+            rows.extend(
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in targets
+            )
+        with transaction.atomic():
+            Follow.objects.bulk_create(
+                rows,
+                batch_size=bulk_batch_size(Follow, batch_size),
+                ignore_conflicts=True,
+            )
+        progress('follows', start + size)
+    importer.rebuild_derived()
+    progress('derived', 1)
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def url_kwargs():
+    """Значения параметров адресов: самая популярная группа, автор
+    с наибольшим числом подписчиков и его последний пост."""
+    author = UserStats.objects.select_related('user').order_by(
+        '-followers_count'
+    ).first()
+    group = Group.objects.order_by('pk').first()
+    values = {}
+    if author:
+        values['username'] = author.user.username
+        post = Post.objects.filter(author_id=author.user_id).first()
+        if post:
+            values['post_id'] = post.pk
+    if group:
+        values['slug'] = group.slug
+    return values
+
+
+def benchmark_urls():
+    """Адреса всех маршрутов posts/urls.py с подставленными параметрами."""
+    values = url_kwargs()
+    recent = (timezone.now() - timedelta(days=1)).date().isoformat()
+    for pattern in urls.urlpatterns:
+        if not isinstance(pattern, URLPattern):
+            continue
+        names = list(pattern.pattern.converters)
+        if any(name not in values for name in names):
+            yield pattern.name, None, None
+            continue
+        url = reverse(
+            f'{urls.app_name}:{pattern.name}',
+            kwargs={name: values[name] for name in names},
+        )
+        params = {
+            key: value.format(recent=recent)
+            for key, value in URL_PARAMS.get(pattern.name, {}).items()
+        }
+        yield pattern.name, url, params
+
+
+def _request(client, url, params):
+    response = client.get(url, params)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def measure(client, url, params, iterations, warmup, memory_iterations,
+            feed_cache=False):
+    """Задержки, число запросов к БД и пиковая память одного адреса.
+
+    Каждый запрос выполняется в транзакции с откатом, поэтому
+    подписки и другие изменения не копятся между замерами. Кеш
+    страниц лент по умолчанию выключен: иначе после прогрева
+    замеряются попадания в него, а не работа представления.
+    """
+    def run():
+        with override_settings(FEED_CACHE=feed_cache):
+            with transaction.atomic():
+                response = _request(client, url, params)
+                transaction.set_rollback(True)
+        return response
+
+    for _ in range(warmup):
+        run()
+    timings, queries = [], []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = run()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(context))
+    peaks = []
+    for _ in range(memory_iterations):
+        tracemalloc.start()
+        run()
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+    return {
+        'url': url,
+        'status': response.status_code,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'queries': max(queries),
+        'peak_kib': round(max(peaks), 1) if peaks else None,
+    }
+
+
+def benchmark_client(username=BENCHMARK_USERNAME):
+    client = Client()
+    user = User.objects.filter(username=username).first() or (
+        User.objects.filter(is_staff=True).first()
+    )
+    if user is not None:
+        client.force_login(user)
+    return client, user
+
+
+def run(iterations=50, warmup=5, memory_iterations=3, names=None,
+        username=BENCHMARK_USERNAME, report=None, feed_cache=False):
+    """Замеряет все адреса posts/urls.py и возвращает отчет."""
+    client, user = benchmark_client(username)
+    results = {}
+    for name, url, params in benchmark_urls():
+        if names and name not in names:
+            continue
+        if url is None:
+            results[name] = {'skipped': 'нет данных для параметров адреса'}
+            continue
+        results[name] = measure(
+            client,
+            url,
+            params,
+            iterations,
+            warmup,
+            memory_iterations,
+            feed_cache,
+        )
+        if report:
+            report(name, results[name])
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'user': user.username if user else None,
+            'iterations': iterations,
+            'feed_cache': feed_cache,
+            'users': User.objects.count(),
+            'posts': Post.objects.count(),
+            'follows': Follow.objects.count(),
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Сравнивает отчет с базовым и возвращает строки с изменениями
+    и список регрессий p95 больше threshold процентов или роста
+    числа запросов."""
+    lines, regressions = [], []
+    for name, result in report['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base or 'p95_ms' not in result or 'p95_ms' not in base:
+            continue
+        change = (result['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100
+        lines.append(
+            f'{name}: p95 {base["p95_ms"]} -> {result["p95_ms"]} мс '
+            f'({change:+.1f}%), запросов {base["queries"]} -> '
+            f'{result["queries"]}'
+        )
+        if change > threshold or result['queries'] > base['queries']:
+            regressions.append(name)
+    return lines, regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def dump(report, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,309 @@
+import hashlib
+import math
+import random
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core import profiler, routers
+
+ARTICLE_TEMPLATE = 'includes/article.html'
+ARTICLE_HITS = 'article_cache:hits'
+ARTICLE_MISSES = 'article_cache:misses'
+FEED_HITS = 'feed_cache:hits'
+FEED_STALE = 'feed_cache:stale'
+FEED_REGENERATIONS = 'feed_cache:regenerations'
+FEED_LOCK_WAITS = 'feed_cache:lock_waits'
+
+
+def _version_key(kind, pk):
+    return f'version:{kind}:{pk}'
+
+
+def get_versions(*objects):
+    """Возвращает метки версий для пар (вид, id).
+
+    Пропавшая из кеша метка заменяется новой, поэтому все фрагменты,
+    собранные по старой метке, перестают находиться.
+    """
+    keys = [_version_key(kind, pk) for kind, pk in objects]
+    versions = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_version(kind, pk):
+    cache.set(_version_key(kind, pk), uuid.uuid4().hex, None)
+
+
+def _feed_scope(name):
+    return hashlib.md5(str(name).encode()).hexdigest()
+
+
+def bump_feed(feed, name='all'):
+    """Сбрасывает кеш страниц ленты: главной, группы или профиля."""
+    bump_version(feed, _feed_scope(name))
+
+
+def bump_all_feeds():
+    bump_version('feeds', 'all')
+
+
+def should_refresh(entry, now):
+    """Проверяет, пора ли пересобирать страницу.
+
+    Страница пересобирается после срока годности и, с вероятностью,
+    растущей к его концу, немного раньше: чем дольше собиралась
+    страница, тем раньше начинается обновление.
+    """
+    beta = settings.FEED_EARLY_REFRESH_BETA
+    early = entry['delta'] * beta * -math.log(1 - random.random())
+    return now + early >= entry['expires']
+
+
+def _store_response(key, response, delta, timeout):
+    cache.set(
+        key,
+        {
+            'content': response.content,
+            'status': response.status_code,
+            'headers': list(response.items()),
+            'expires': time.time() + timeout,
+            'delta': delta,
+        },
+        timeout + settings.FEED_STALE_TIMEOUT,
+    )
+
+
+def _restore_response(entry):
+    response = HttpResponse(entry['content'], status=entry['status'])
+    for header, value in entry['headers']:
+        response[header] = value
+    return response
+
+
+def _regenerate(key, build, timeout):
+    _incr(FEED_REGENERATIONS)
+    started = time.time()
+    response = build()
+    if response.status_code == 200 and not response.streaming:
+        _store_response(key, response, time.time() - started, timeout)
+    return response
+
+
+def cached_response(key, build, timeout=None):
+    """Отдает ответ из кеша, пересобирая его под блокировкой.
+
+    Пока один процесс пересобирает устаревшую страницу, остальные
+    отдают старую копию. Если копии нет, они ждут новую не дольше
+    FEED_LOCK_WAIT секунд. Без timeout страница хранится
+    CACHE_TIMEOUT секунд.
+    """
+    if timeout is None:
+        timeout = settings.CACHE_TIMEOUT
+    entry = cache.get(key)
+    if entry is not None and not should_refresh(entry, time.time()):
+        _incr(FEED_HITS)
+        return _restore_response(entry)
+    lock_key = f'lock:{key}'
+    if cache.add(lock_key, 1, settings.FEED_LOCK_TIMEOUT):
+        try:
+            return _regenerate(key, build, timeout)
+        finally:
+            cache.delete(lock_key)
+    if entry is not None:
+        _incr(FEED_STALE)
+        return _restore_response(entry)
+    _incr(FEED_LOCK_WAITS)
+    deadline = time.time() + settings.FEED_LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(settings.FEED_LOCK_POLL)
+        entry = cache.get(key)
+        if entry is not None:
+            return _restore_response(entry)
+    return _regenerate(key, build, timeout)
+
+
+def cache_feed(feed, url_kwarg=None):
+    """Кеширует страницы ленты до смены ее версии.
+
+    Версия ленты меняется сигналами моделей, поэтому страницы хранятся
+    CACHE_TIMEOUT секунд и не показывают устаревших постов. Ключ
+    страницы зависит от адреса и пользователя. Страницы, собранные
+    с реплики, могут отставать от версии ленты, поэтому хранятся
+    под своим ключом только REPLICA_CACHE_TIMEOUT секунд.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if (
+                request.method not in ('GET', 'HEAD')
+                or not settings.FEED_CACHE
+                or profiler.is_profiled(request)
+            ):
+                return view_func(request, *args, **kwargs)
+            scope = _feed_scope(kwargs[url_kwarg] if url_kwarg else 'all')
+            key = 'feed:{}:{}:{}:{}:{}'.format(
+                feed,
+                scope,
+                ':'.join(get_versions(('feeds', 'all'), (feed, scope))),
+                hashlib.md5(request.get_full_path().encode()).hexdigest(),
+                request.user.pk or 0,
+            )
+            timeout = None
+            if routers.replica_routed():
+                key += ':replica'
+                timeout = settings.REPLICA_CACHE_TIMEOUT
+            return cached_response(
+                key, lambda: view_func(request, *args, **kwargs), timeout
+            )
+        return _wrapped_view
+    return decorator
+
+
+def _incr(key, delta=1):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, delta, None)
+
+
+def _article_objects(post):
+    objects = [('post', post.id), ('user', post.author_id)]
+    if post.group_id:
+        objects.append(('group', post.group_id))
+    return objects
+
+
+def _viewer(request, post):
+    if request is None or not request.user.is_authenticated:
+        return 'guest'
+    if request.user.pk == post.author_id:
+        return 'author'
+    return 'user'
+
+
+class ArticlePage:
+    """Фрагменты постов одной страницы.
+
+    При выводе первого поста метки версий и фрагменты всей страницы
+    читаются из кеша двумя запросами, счетчики попаданий и промахов
+    обновляются по разу. missing получает только посты-промахи до их
+    рендера, например чтобы найти их миниатюры.
+    """
+
+    def __init__(self, posts, missing=None):
+        self.posts = list(posts)
+        self.missing = missing
+        self.versions = None
+        self.loaded = {}
+
+    def key(self, post, viewer, flags):
+        return 'article:{}:{}:{}:{}'.format(
+            post.id,
+            ':'.join(
+                self.versions[obj] for obj in _article_objects(post)
+            ),
+            viewer,
+            ','.join(f'{name}={value}' for name, value in flags),
+        )
+
+    def fragments(self, request, flags):
+        if self.versions is None:
+            objects = list(dict.fromkeys(
+                obj for post in self.posts for obj in _article_objects(post)
+            ))
+            self.versions = dict(zip(objects, get_versions(*objects)))
+        if flags not in self.loaded:
+            keys = {
+                post.id: self.key(post, _viewer(request, post), flags)
+                for post in self.posts
+            }
+            found = cache.get_many(list(keys.values()))
+            missed = [
+                post for post in self.posts if keys[post.id] not in found
+            ]
+            if found:
+                _incr(ARTICLE_HITS, len(found))
+            if missed:
+                _incr(ARTICLE_MISSES, len(missed))
+                if self.missing is not None:
+                    self.missing(missed)
+            self.loaded[flags] = (keys, found)
+        return self.loaded[flags]
+
+    def render(self, post, request, using, flags):
+        keys, found = self.fragments(request, flags)
+        html = found.get(keys[post.id])
+        if html is None:
+            html = render_to_string(
+                ARTICLE_TEMPLATE,
+                {'post': post, **dict(flags)},
+                request,
+                using=using,
+            )
+            # Фрагмент с исходной картинкой вместо миниатюры не
+            # кешируется: миниатюра появится после генерации в пуле.
+            if not getattr(post.image, 'thumbnail_pending', False):
+                cache.set(keys[post.id], html, settings.ARTICLE_CACHE_TIMEOUT)
+        return mark_safe(html)
+
+
+def prefetch_articles(posts, missing=None):
+    """Связывает посты страницы, чтобы их фрагменты читались разом."""
+    page = ArticlePage(posts, missing)
+    for post in page.posts:
+        post.article_page = page
+
+
+def render_article(post, request=None, using=None, **flags):
+    """Возвращает HTML includes/article.html из кеша фрагментов.
+
+    Ключ фрагмента состоит из id поста, меток версий поста, автора
+    и группы, роли зрителя и флагов шаблона. Промах рендерится
+    с контекстом запроса, но фрагмент делят все зрители одной роли:
+    гости, читатели или автор поста, поэтому от пользователя шаблон
+    может зависеть только через роль. Шаблоны Django и Jinja2 выводят
+    одинаковый HTML, поэтому фрагмент общий для обоих, а using
+    выбирает шаблонизатор для промаха. Посты из prefetch_articles
+    читаются из кеша всей страницей.
+    """
+    page = getattr(post, 'article_page', None)
+    if page is None:
+        page = ArticlePage([post])
+    return page.render(post, request, using, tuple(sorted(flags.items())))
+
+
+def article_stats():
+    """Счетчики попаданий в кеш фрагментов постов."""
+    counters = cache.get_many([ARTICLE_HITS, ARTICLE_MISSES])
+    hits = counters.get(ARTICLE_HITS, 0)
+    misses = counters.get(ARTICLE_MISSES, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0,
+    }
+
+
+def feed_stats():
+    """Счетчики кеша страниц лент."""
+    counters = cache.get_many(
+        [FEED_HITS, FEED_STALE, FEED_REGENERATIONS, FEED_LOCK_WAITS]
+    )
+    return {
+        'hits': counters.get(FEED_HITS, 0),
+        'stale': counters.get(FEED_STALE, 0),
+        'regenerations': counters.get(FEED_REGENERATIONS, 0),
+        'lock_waits': counters.get(FEED_LOCK_WAITS, 0),
+    }
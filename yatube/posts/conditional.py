@@ -0,0 +1,123 @@
+import hashlib
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max
+from django.views.decorators.http import condition
+
+from core import profiler
+
+from .cache import get_versions
+from .follows import is_following
+from .models import Post
+
+User = get_user_model()
+
+
+def _etag(request, *parts):
+    """ETag страницы для текущего адреса и пользователя."""
+    value = '|'.join(
+        str(part) for part in (request.get_full_path(), request.user.pk,
+                               *parts)
+    )
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def _single_row(queryset):
+    """Единственная строка агрегата или None.
+
+    first() добавил бы ORDER BY pk, и SQLite сортировал бы результат
+    GROUP BY во временном B-дереве.
+    """
+    return next(iter(queryset[:1]), None)
+
+
+def post_detail_validators(request, post_id):
+    """ETag и Last-Modified поста одним агрегирующим запросом.
+
+    Учитываются правка поста, новые комментарии и число постов
+    автора. Удаление комментария, имена автора и группы попадают
+    в ETag через метки версий.
+    """
+    row = _single_row(Post.objects.filter(pk=post_id).order_by().values(
+        'updated_at', 'author_id', 'group_id', 'author__stats__posts_count'
+    ).annotate(
+        commented=Max('comments__created'),
+    ))
+    if row is None:
+        return None, None
+    objects = [('post', post_id), ('user', row['author_id'])]
+    if row['group_id']:
+        objects.append(('group', row['group_id']))
+    last_modified = max(
+        date for date in (row['updated_at'], row['commented']) if date
+    )
+    etag = _etag(
+        request,
+        last_modified.isoformat(),
+        row['author__stats__posts_count'],
+        *get_versions(*objects),
+    )
+    return etag, last_modified
+
+
+def profile_validators(request, username):
+    """ETag и Last-Modified профиля одним агрегирующим запросом.
+
+    Last-Modified берется по последнему измененному посту автора,
+    а счетчики и подписка текущего пользователя попадают в ETag.
+    """
+    row = _single_row(User.objects.filter(
+        username=username
+    ).order_by().values(
+        'pk',
+        'stats__posts_count',
+        'stats__followers_count',
+        'stats__following_count',
+    ).annotate(
+        newest=Max('posts__updated_at'),
+    ))
+    if row is None:
+        return None, None
+    etag = _etag(
+        request,
+        row['newest'] and row['newest'].isoformat(),
+        row['stats__posts_count'],
+        row['stats__followers_count'],
+        row['stats__following_count'],
+        is_following(request.user, [row['pk']])[row['pk']],
+        *get_versions(('user', row['pk'])),
+    )
+    return etag, row['newest']
+
+
+def conditional(get_validators):
+    """Декоратор ответа 304 по валидаторам из get_validators.
+
+    Валидаторы считаются один раз на запрос, до загрузки объектов
+    и рендера шаблона. Профилируемые запросы получают полный ответ.
+    """
+    def validators(request, *args, **kwargs):
+        if not hasattr(request, '_validators'):
+            request._validators = get_validators(request, *args, **kwargs)
+        return request._validators
+
+    conditional_decorator = condition(
+        etag_func=lambda request, *args, **kwargs: validators(
+            request, *args, **kwargs
+        )[0],
+        last_modified_func=lambda request, *args, **kwargs: validators(
+            request, *args, **kwargs
+        )[1],
+    )
+
+    def decorator(view_func):
+        conditional_view = conditional_decorator(view_func)
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if profiler.is_profiled(request):
+                return view_func(request, *args, **kwargs)
+            return conditional_view(request, *args, **kwargs)
+        return _wrapped_view
+    return decorator
@@ -0,0 +1,106 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+
+from .cache import get_versions
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.FEED_COUNT_WORKERS
+        )
+    return _executor
+
+
+def _key(feed, name, generation=None):
+    if generation is None:
+        generation, = get_versions(('feeds', 'all'))
+    return f'feed_count:{feed}:{name}:{generation}'
+
+
+def _store(key, count, expires):
+    cache.set(key, {'count': count, 'expires': expires}, None)
+
+
+def refresh(key, queryset):
+    """Считает точное число записей ленты и кладет его в кеш."""
+    try:
+        _store(
+            key,
+            queryset.order_by().count(),
+            time.time() + settings.FEED_COUNT_TIMEOUT,
+        )
+    finally:
+        cache.delete(f'{key}:pending')
+
+
+def _refresh_in_thread(key, queryset):
+    try:
+        refresh(key, queryset)
+    finally:
+        connections.close_all()
+
+
+def schedule(key, queryset):
+    """Ставит точный подсчет в фоновый поток после коммита."""
+    if not cache.add(f'{key}:pending', 1, settings.FEED_COUNT_PENDING):
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_refresh_in_thread, key, queryset)
+    )
+
+
+def get_count(feed, name, queryset):
+    """Число записей ленты и признак точности.
+
+    Запрос не считает COUNT(*) по всей ленте: число берется из кеша,
+    а устаревшее пересчитывается в фоне. Пока точного числа нет,
+    возвращается подсчет до NUMBERED_PAGINATION_LIMIT + 1 записей.
+    """
+    key = _key(feed, name)
+    entry = cache.get(key)
+    if entry is None:
+        schedule(key, queryset)
+        limit = settings.NUMBERED_PAGINATION_LIMIT
+        return queryset.order_by()[:limit + 1].count(), False
+    if entry['expires'] <= time.time():
+        schedule(key, queryset)
+        return entry['count'], False
+    return entry['count'], True
+
+
+def adjust(feed, name, delta):
+    """Сдвигает закешированное число записей ленты.
+
+    Одновременные изменения могут потерять сдвиг, его исправит
+    следующий фоновый пересчет.
+    """
+    adjust_many(feed, [name], delta)
+
+
+def adjust_many(feed, names, delta):
+    """Сдвигает числа записей нескольких лент одним чтением кеша."""
+    if not names:
+        return
+    generation, = get_versions(('feeds', 'all'))
+    keys = [_key(feed, name, generation) for name in names]
+    entries = cache.get_many(keys)
+    for entry in entries.values():
+        entry['count'] = max(entry['count'] + delta, 0)
+    cache.set_many(entries, None)
+
+
+def expire(feed, name):
+    """Помечает число записей ленты устаревшим."""
+    key = _key(feed, name)
+    entry = cache.get(key)
+    if entry is not None:
+        entry['expires'] = 0
+        _store(key, **entry)
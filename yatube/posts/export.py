@@ -0,0 +1,87 @@
+import json
+import zlib
+from datetime import datetime
+
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Post
+
+CHUNK_SIZE = 1000
+
+
+def parse_bound(value):
+    """Дата или дата со временем из параметра фильтра."""
+    date = parse_datetime(value)
+    if date is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Неверная дата: {value}')
+        date = datetime.combine(day, datetime.min.time())
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def filter_posts(group=None, author=None, since=None, until=None):
+    """Посты для выгрузки: группа по slug, автор по username и даты
+    публикации since включительно и until не включительно."""
+    posts = Post.objects.all()
+    if group:
+        posts = posts.filter(group__slug=group)
+    if author:
+        posts = posts.filter(author__username=author)
+    if since:
+        posts = posts.filter(pub_date__gte=parse_bound(since))
+    if until:
+        posts = posts.filter(pub_date__lt=parse_bound(until))
+    return posts
+
+
+def serialize(post):
+    return {
+        'id': post.id,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group else None,
+        'image': post.image.name or None,
+        'comments_count': post.comments_count,
+    }
+
+
+def iter_posts(posts, chunk_size=CHUNK_SIZE):
+    """Обходит посты по возрастанию id пачками через .iterator().
+
+    Каждая пачка читается отдельным запросом по диапазону первичного
+    ключа, поэтому память не растет с размером выгрузки.
+    """
+    posts = posts.select_related('author', 'group').order_by('pk')
+    last_pk = 0
+    while True:
+        chunk = posts.filter(pk__gt=last_pk)[:chunk_size]
+        chunk = chunk.annotate(comments_count=Count('comments'))
+        found = False
+        for post in chunk.iterator():
+            found = True
+            last_pk = post.pk
+            yield post
+        if not found:
+            return
+
+
+def iter_ndjson(posts, chunk_size=CHUNK_SIZE):
+    """Строки NDJSON для каждого поста."""
+    for post in iter_posts(posts, chunk_size):
+        yield json.dumps(serialize(post), ensure_ascii=False) + '\n'
+
+
+def gzip_lines(lines, level=6):
+    """Сжимает строки в поток gzip на лету."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for line in lines:
+        data = compressor.compress(line.encode())
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,70 @@
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import bump_version, get_versions
+from .models import Follow
+
+ID_TYPECODE = 'Q'
+
+
+def _key(user_id):
+    generation, = get_versions(('follows', 'all'))
+    return f'follows:{generation}:{user_id}'
+
+
+def _load(user_id):
+    """Отсортированные id авторов, на которых подписан пользователь.
+
+    В кеше id лежат упакованным массивом по 8 байт на автора.
+    """
+    key = _key(user_id)
+    packed = cache.get(key)
+    ids = array(ID_TYPECODE)
+    if packed is None:
+        ids.extend(sorted(
+            Follow.objects.filter(user_id=user_id).order_by().values_list(
+                'author_id', flat=True
+            )
+        ))
+        cache.set(key, ids.tobytes(), settings.FOLLOW_CACHE_TIMEOUT)
+    else:
+        ids.frombytes(packed)
+    return ids
+
+
+def following_ids(user):
+    """Множество id авторов, на которых подписан пользователь."""
+    if not user.is_authenticated:
+        return frozenset()
+    return frozenset(_load(user.pk))
+
+
+def is_following(user, author_ids):
+    """Подписан ли пользователь на каждого из авторов.
+
+    Возвращает словарь {id автора: bool} за одно обращение к кешу,
+    анонимный пользователь ни на кого не подписан.
+    """
+    author_ids = list(author_ids)
+    if not user.is_authenticated:
+        return dict.fromkeys(author_ids, False)
+    ids = _load(user.pk)
+    result = {}
+    for author_id in author_ids:
+        index = bisect_left(ids, author_id)
+        result[author_id] = index < len(ids) and ids[index] == author_id
+    return result
+
+
+def invalidate(user_id):
+    """Сбрасывает кеш подписок пользователя после их изменения."""
+    cache.delete(_key(user_id))
+
+
+def invalidate_all():
+    """Сбрасывает кеш подписок всех пользователей, например после
+    массовой загрузки в обход сигналов."""
+    bump_version('follows', 'all')
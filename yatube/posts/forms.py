@@ -1,9 +1,17 @@
 from django import forms
 
+from . import thumbnails
 from .models import Comment, Post
 
 
 class PostForm(forms.ModelForm):
+    def save(self, commit=True):
+        """Сохраняет пост и ставит в очередь миниатюры новой картинки."""
+        post = super().save(commit)
+        if commit and 'image' in self.changed_data and post.image:
+            thumbnails.schedule(post.image.name, post.id)
+        return post
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
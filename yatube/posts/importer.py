@@ -0,0 +1,329 @@
+import csv
+import json
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import cache, follows, search, stats, timeline
+from .models import Comment, Follow, Group, Post, UserStats
+from .utils import bulk_batch_size
+
+User = get_user_model()
+
+FORMATS = ('ndjson', 'csv')
+# Сколько id проверять одним запросом IN.
+ID_CHUNK = 500
+
+
+class ImportRowError(Exception):
+    """Ошибка в строке импортируемого файла."""
+
+
+def detect_format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+
+def read_rows(stream, fmt):
+    """Построчно читает записи NDJSON или CSV, не загружая весь файл.
+
+    Вместо строки с неверным JSON отдается ImportRowError, чтобы она
+    попала в ошибки со своим номером и не прервала импорт.
+    """
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            yield {key: value for key, value in row.items() if value != ''}
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                yield ImportRowError(f'неверный JSON: {error}')
+
+
+def read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as checkpoint:
+        return int(checkpoint.read().strip() or 0)
+
+
+def write_checkpoint(path, rows):
+    """Атомарно сохраняет число обработанных строк."""
+    if not path:
+        return
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as checkpoint:
+        checkpoint.write(str(rows))
+    os.replace(tmp_path, path)
+
+
+def parse_date(value):
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise ImportRowError(f'неверная дата {value!r}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+class ContentImporter:
+    """Загружает посты, комментарии и подписки пачками bulk_create.
+
+    Каждая строка содержит поле type: post, comment или follow.
+    Авторы и группы ищутся в словарях, загруженных один раз, поэтому
+    запросы к БД выполняются только при записи пачки.
+    """
+
+    def __init__(self, batch_size=1000, create_users=False):
+        self.batch_size = batch_size
+        self.create_users = create_users
+        self.users = dict(User.objects.values_list('username', 'id'))
+        self.groups = dict(Group.objects.values_list('slug', 'id'))
+        self.posts, self.comments, self.follows = [], [], []
+        self.new_users = set()
+        self.created = {'post': 0, 'comment': 0, 'follow': 0}
+        self.errors = []
+
+    def username(self, username):
+        if not username:
+            raise ImportRowError('не указан пользователь')
+        if username not in self.users:
+            if not self.create_users:
+                raise ImportRowError(
+                    f'неизвестный пользователь {username!r}'
+                )
+            self.users[username] = None
+            self.new_users.add(username)
+        return username
+
+    def group_id(self, slug):
+        if not slug:
+            return None
+        if slug not in self.groups:
+            raise ImportRowError(f'неизвестная группа {slug!r}')
+        return self.groups[slug]
+
+    def object_id(self, value):
+        if value in (None, ''):
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ImportRowError(f'неверный id {value!r}')
+
+    def post_id(self, value):
+        if not value:
+            raise ImportRowError('не указан пост')
+        return self.object_id(value)
+
+    def add(self, number, row):
+        """Разбирает строку и добавляет ее в пачку."""
+        try:
+            if isinstance(row, ImportRowError):
+                raise row
+            if not isinstance(row, dict):
+                raise ImportRowError('запись не является объектом')
+            kind = row.get('type')
+            if kind == 'post':
+                self.posts.append((
+                    number,
+                    self.username(row.get('author')),
+                    Post(
+                        id=self.object_id(row.get('id')),
+                        text=row.get('text', ''),
+                        pub_date=parse_date(row.get('pub_date')),
+                        group_id=self.group_id(row.get('group')),
+                        image=row.get('image', ''),
+                    ),
+                ))
+            elif kind == 'comment':
+                self.comments.append((
+                    number,
+                    self.username(row.get('author')),
+                    Comment(
+                        id=self.object_id(row.get('id')),
+                        post_id=self.post_id(row.get('post')),
+                        text=row.get('text', ''),
+                        created=parse_date(row.get('created')),
+                    ),
+                ))
+            elif kind == 'follow':
+                user = self.username(row.get('user'))
+                author = self.username(row.get('author'))
+                if user == author:
+                    raise ImportRowError('подписка на самого себя')
+                self.follows.append((number, user, author))
+            else:
+                raise ImportRowError(f'неизвестный тип записи {kind!r}')
+        except ImportRowError as error:
+            self.errors.append((number, str(error)))
+
+    def pending(self):
+        return len(self.posts) + len(self.comments) + len(self.follows)
+
+    def _create_users(self):
+        if not self.new_users:
+            return
+        User.objects.bulk_create(
+            (User(username=username, password='!')
+             for username in self.new_users),
+            batch_size=bulk_batch_size(User, self.batch_size),
+            ignore_conflicts=True,
+        )
+        created = dict(
+            User.objects.filter(
+                username__in=self.new_users
+            ).values_list('username', 'id')
+        )
+        UserStats.objects.bulk_create(
+            (UserStats(user_id=user_id) for user_id in created.values()),
+            batch_size=bulk_batch_size(UserStats, self.batch_size),
+            ignore_conflicts=True,
+        )
+        self.users.update(created)
+        self.new_users.clear()
+
+    def existing(self, model, ids):
+        """Те из ids, что уже есть в базе."""
+        ids = list(ids)
+        found = set()
+        for start in range(0, len(ids), ID_CHUNK):
+            found.update(
+                model.objects.filter(
+                    id__in=ids[start:start + ID_CHUNK]
+                ).values_list('id', flat=True)
+            )
+        return found
+
+    def unique(self, model, rows):
+        """Отбрасывает строки с id, уже занятыми в базе или в пачке."""
+        taken = self.existing(
+            model, {obj.id for _, _, obj in rows if obj.id is not None}
+        )
+        result = []
+        for number, username, obj in rows:
+            if obj.id is not None:
+                if obj.id in taken:
+                    self.errors.append((number, f'id {obj.id} уже занят'))
+                    continue
+                taken.add(obj.id)
+            result.append((number, username, obj))
+        return result
+
+    def with_posts(self, comments, posts):
+        """Отбрасывает комментарии к постам, которых нет ни в базе,
+        ни в пачке."""
+        post_ids = {post.id for _, _, post in posts if post.id is not None}
+        post_ids |= self.existing(
+            Post, {comment.post_id for _, _, comment in comments} - post_ids
+        )
+        result = []
+        for number, username, comment in comments:
+            if comment.post_id not in post_ids:
+                self.errors.append(
+                    (number, f'неизвестный пост {comment.post_id}')
+                )
+                continue
+            result.append((number, username, comment))
+        return result
+
+    def flush(self):
+        """Записывает накопленную пачку в одной транзакции.
+
+        Строки с занятыми id и комментарии к несуществующим постам
+        отбрасываются с ошибкой. Если база все же отклонила пачку,
+        она целиком попадает в ошибки, и импорт продолжается.
+        """
+        rows = self.posts, self.comments, self.follows
+        first = min(
+            (items[0][0] for items in rows if items), default=None
+        )
+        self.posts, self.comments, self.follows = [], [], []
+        try:
+            self.write(*rows)
+        except IntegrityError as error:
+            # Пользователи из откатившейся пачки не созданы.
+            self.users = dict(User.objects.values_list('username', 'id'))
+            self.errors.append((first, f'пачка не записана: {error}'))
+
+    @transaction.atomic
+    def write(self, posts, comments, pairs):
+        posts = self.unique(Post, posts)
+        comments = self.with_posts(self.unique(Comment, comments), posts)
+        self._create_users()
+        for _, username, post in posts:
+            post.author_id = self.users[username]
+        for _, username, comment in comments:
+            comment.author_id = self.users[username]
+        follows = [
+            Follow(user_id=self.users[user], author_id=self.users[author])
+            for _, user, author in pairs
+        ]
+        Post.objects.bulk_create(
+            [post for _, _, post in posts],
+            batch_size=bulk_batch_size(Post, self.batch_size),
+        )
+        Comment.objects.bulk_create(
+            [comment for _, _, comment in comments],
+            batch_size=bulk_batch_size(Comment, self.batch_size),
+        )
+        Follow.objects.bulk_create(
+            follows,
+            batch_size=bulk_batch_size(Follow, self.batch_size),
+            ignore_conflicts=True,
+        )
+        self.created['post'] += len(posts)
+        self.created['comment'] += len(comments)
+        self.created['follow'] += len(follows)
+
+    def run(self, rows, skip=0, checkpoint=None, report=None):
+        """Импортирует строки, пропуская skip уже загруженных.
+
+        После каждой записанной пачки номер строки сохраняется
+        в checkpoint, и report получает число строк и время работы.
+        """
+        started = time.monotonic()
+        number = 0
+        for number, row in enumerate(rows, 1):
+            if number <= skip:
+                continue
+            self.add(number, row)
+            if self.pending() >= self.batch_size:
+                self.flush()
+                write_checkpoint(checkpoint, number)
+                if report:
+                    report(number - skip, time.monotonic() - started)
+        if self.pending():
+            self.flush()
+        write_checkpoint(checkpoint, number)
+        return max(number - skip, 0), time.monotonic() - started
+
+
+def reset_sequences():
+    """Сдвигает счетчики id после вставки строк с явными id."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [Post, Comment, Follow]
+    )
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def rebuild_derived():
+    """Один раз пересобирает данные, которые сигналы ведут по строкам."""
+    reset_sequences()
+    stats.recount()
+    timeline.rebuild()
+    search.rebuild()
+    cache.bump_all_feeds()
+    follows.invalidate_all()
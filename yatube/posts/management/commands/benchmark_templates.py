@@ -0,0 +1,204 @@
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from posts.benchmark import percentile
+from posts.forms import CommentForm
+from posts.models import Comment, Group, Post, UserStats
+from posts.utils import CursorPage
+
+User = get_user_model()
+
+ENGINES = ('django', 'jinja2')
+
+
+def make_objects(posts, comments):
+    """Посты, группа, авторы и комментарии в памяти, без запросов к БД."""
+    now = timezone.now()
+    group = Group(id=1, title='Группа', slug='group', description='Описание')
+    authors = []
+    for number in range(1, 6):
+        author = User(
+            id=number,
+            username=f'author{number}',
+            first_name='Имя' if number % 2 else '',
+            last_name='Фамилия' if number % 2 else '',
+        )
+        author.stats = UserStats(user=author, posts_count=posts)
+        authors.append(author)
+    post_list = [
+        Post(
+            id=number,
+            text=f'Пост {number}\nвторая строка & <b>разметка</b>',
+            pub_date=now - timedelta(minutes=number),
+            author=authors[number % len(authors)],
+            group=group if number % 2 else None,
+        )
+        for number in range(1, posts + 1)
+    ]
+    comment_list = [
+        Comment(
+            id=number,
+            post=post_list[0],
+            author=authors[number % len(authors)],
+            text=f'Комментарий {number}\nстрока',
+            created=now,
+        )
+        for number in range(1, comments + 1)
+    ]
+    return group, authors, post_list, comment_list
+
+
+def make_pages(user, posts, comments):
+    """Имя шаблона, адрес и контекст для каждой горячей страницы."""
+    group, authors, post_list, comment_list = make_objects(posts, comments)
+    page_obj = Paginator(post_list * 10, posts).page(2)
+    author = authors[0]
+    return {
+        'index': (
+            'posts/index.html',
+            reverse('posts:index'),
+            {'page_obj': page_obj},
+        ),
+        'group_list': (
+            'posts/group_list.html',
+            reverse('posts:group_list', args=(group.slug,)),
+            {'group': group, 'page_obj': page_obj},
+        ),
+        'profile': (
+            'posts/profile.html',
+            reverse('posts:profile', args=(author.username,)),
+            {'author': author, 'page_obj': page_obj, 'following': True},
+        ),
+        'post_detail': (
+            'posts/post_detail.html',
+            reverse('posts:post_detail', args=(post_list[0].id,)),
+            {
+                'post': post_list[0],
+                'comments': CursorPage(comment_list, None, next_cursor='x'),
+                'form': CommentForm(),
+            },
+        ),
+        'follow_index': (
+            'posts/follow.html',
+            reverse('posts:follow_index'),
+            {'page_obj': page_obj},
+        ),
+    }
+
+
+def make_request(url, user):
+    request = RequestFactory().get(url)
+    request.resolver_match = resolve(url)
+    request.user = user
+    return request
+
+
+def measure(template, url, context, user, engine, iterations, warmup):
+    timings = []
+    for number in range(warmup + iterations):
+        # Контекст копируется: бэкенды дополняют его при рендере.
+        request = make_request(url, user)
+        started = time.perf_counter()
+        render_to_string(template, dict(context), request, using=engine)
+        if number >= warmup:
+            timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время рендера горячих шаблонов лент, поста и шапки '
+        'в шаблонизаторах Django и Jinja2 на данных в памяти.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help='Страницы: index, group_list, profile, post_detail, '
+                 'follow_index. По умолчанию все.',
+        )
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument(
+            '--posts',
+            type=int,
+            default=settings.NUM_OF_POST,
+            help='Постов на странице ленты.',
+        )
+        parser.add_argument(
+            '--comments',
+            type=int,
+            default=settings.NUM_OF_COMMENTS,
+            help='Комментариев на странице поста.',
+        )
+        parser.add_argument(
+            '--anonymous',
+            action='store_true',
+            help='Рендерить для анонимного пользователя.',
+        )
+        parser.add_argument(
+            '--no-fragment-cache',
+            action='store_true',
+            help='Рендерить посты заново, без кеша фрагментов.',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Вывести результаты в JSON.',
+        )
+
+    def handle(self, *args, **options):
+        if options['anonymous']:
+            user = AnonymousUser()
+        else:
+            user = User(id=100, username='benchmark')
+        pages = make_pages(user, options['posts'], options['comments'])
+        names = options['names'] or list(pages)
+        timeout = settings.ARTICLE_CACHE_TIMEOUT
+        if options['no_fragment_cache']:
+            timeout = 0
+        results = []
+        # Без DEBUG шаблоны Django читаются кеширующим загрузчиком,
+        # а Jinja2 не проверяет изменения файлов, как в продакшене.
+        with override_settings(DEBUG=False, ARTICLE_CACHE_TIMEOUT=timeout):
+            for name in names:
+                template, url, context = pages[name]
+                row = {'page': name}
+                for engine in ENGINES:
+                    row[engine] = measure(
+                        template,
+                        url,
+                        context,
+                        user,
+                        engine,
+                        options['iterations'],
+                        options['warmup'],
+                    )
+                row['speedup'] = round(
+                    row['django']['mean_ms'] / row['jinja2']['mean_ms'], 2
+                )
+                results.append(row)
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for row in results:
+            self.stdout.write(
+                '{page}: django {django[mean_ms]} мс, jinja2 '
+                '{jinja2[mean_ms]} мс, ускорение {speedup}x'.format(**row)
+            )
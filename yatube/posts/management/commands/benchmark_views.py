@@ -0,0 +1,78 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p95/p99, число запросов к БД и память для всех '
+        'адресов posts/urls.py и выводит отчет в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help='Имена маршрутов, по умолчанию все.',
+        )
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--memory-iterations',
+            type=int,
+            default=3,
+            help='Сколько запросов выполнить под tracemalloc.',
+        )
+        parser.add_argument(
+            '--username',
+            default=benchmark.BENCHMARK_USERNAME,
+            help='Пользователь, от имени которого идут запросы.',
+        )
+        parser.add_argument(
+            '--feed-cache',
+            action='store_true',
+            help='Не выключать кеш страниц лент во время замеров.',
+        )
+        parser.add_argument('--output', help='Файл для отчета.')
+        parser.add_argument('--baseline', help='Отчет для сравнения.')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=10.0,
+            help='Допустимый рост p95 относительно базового отчета, %%.',
+        )
+
+    def report(self, name, result):
+        self.stderr.write(
+            f'{name}: p50 {result["p50_ms"]} мс, p95 {result["p95_ms"]} мс, '
+            f'запросов {result["queries"]}'
+        )
+
+    def handle(self, *args, **options):
+        report = benchmark.run(
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            memory_iterations=options['memory_iterations'],
+            names=options['names'],
+            username=options['username'],
+            report=self.report,
+            feed_cache=options['feed_cache'],
+        )
+        if options['output']:
+            benchmark.dump(report, options['output'])
+        else:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        if not options['baseline']:
+            return
+        lines, regressions = benchmark.compare(
+            report, benchmark.load(options['baseline']), options['threshold']
+        )
+        for line in lines:
+            self.stderr.write(line)
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно базового отчета: '
+                + ', '.join(regressions)
+            )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.cache import article_stats, feed_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает счетчики кеша фрагментов постов и страниц лент.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            'Фрагменты постов: попаданий {hits}, промахов {misses}, '
+            'доля попаданий {hit_rate:.1%}'.format(**article_stats())
+        )
+        self.stdout.write(
+            'Страницы лент: попаданий {hits}, устаревших копий {stale}, '
+            'пересборок {regenerations}, ожиданий блокировки '
+            '{lock_waits}'.format(**feed_stats())
+        )
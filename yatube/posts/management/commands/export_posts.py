@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты в NDJSON с авторами, группами и числом ' \
+           'комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='Файл для выгрузки, по умолчанию стандартный вывод.',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Сжимать выгрузку gzip.',
+        )
+        parser.add_argument('--group', help='Slug группы.')
+        parser.add_argument('--author', help='Имя автора.')
+        parser.add_argument(
+            '--since', help='Посты, опубликованные с этой даты.'
+        )
+        parser.add_argument(
+            '--until', help='Посты, опубликованные до этой даты.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=export.CHUNK_SIZE,
+            help='Сколько постов читать одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            posts = export.filter_posts(
+                group=options['group'],
+                author=options['author'],
+                since=options['since'],
+                until=options['until'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        lines = export.iter_ndjson(posts, options['chunk_size'])
+        if not options['output']:
+            if options['gzip']:
+                raise CommandError('Для --gzip укажите файл в --output.')
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'wb') as output:
+            if options['gzip']:
+                for data in export.gzip_lines(lines):
+                    output.write(data)
+            else:
+                for line in lines:
+                    output.write(line.encode())
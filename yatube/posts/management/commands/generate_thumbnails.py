@@ -0,0 +1,57 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import cache
+from posts.models import Post
+from posts.thumbnails import generate, init_worker, remember
+
+
+class Command(BaseCommand):
+    help = 'Создает миниатюры картинок всех постов в пуле процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.THUMBNAIL_WORKERS,
+            help='Число процессов.',
+        )
+        parser.add_argument(
+            '--chunksize',
+            type=int,
+            default=16,
+            help='Сколько картинок передавать процессу за раз.',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Удалить готовые миниатюры и создать их заново.',
+        )
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(
+            image=''
+        ).exclude(
+            image=None
+        ).order_by().values_list('image', flat=True).distinct()
+        total = names.count()
+        self.stdout.write(f'Картинок: {total}')
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            initializer=init_worker,
+        ) as executor:
+            results = executor.map(
+                partial(generate, force=options['force']),
+                names.iterator(),
+                chunksize=options['chunksize'],
+            )
+            for done, entries in enumerate(results, 1):
+                remember(entries)
+                if done % 100 == 0 or done == total:
+                    self.stdout.write(f'Обработано {done} из {total}')
+        # Страницы лент могли закешироваться с исходными картинками.
+        cache.bump_all_feeds()
+        self.stdout.write(self.style.SUCCESS('Миниатюры созданы.'))
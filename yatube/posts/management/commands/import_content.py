@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии и подписки из NDJSON или CSV. '
+        'Каждая запись содержит поле type: post, comment или follow.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с записями.')
+        parser.add_argument(
+            '--format',
+            choices=importer.FORMATS,
+            help='Формат файла, по умолчанию определяется по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько записей писать в одной транзакции.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл с номером последней загруженной строки для '
+                 'продолжения прерванного импорта.',
+        )
+        parser.add_argument(
+            '--create-users',
+            action='store_true',
+            help='Создавать неизвестных пользователей без пароля.',
+        )
+        parser.add_argument(
+            '--no-rebuild',
+            action='store_true',
+            help='Не пересобирать счетчики, ленты, поиск и кеш.',
+        )
+
+    def report(self, rows, seconds):
+        rate = rows / seconds if seconds else 0
+        self.stdout.write(f'Обработано строк: {rows}, {rate:.0f} строк/с')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or importer.detect_format(path)
+        skip = importer.read_checkpoint(options['checkpoint'])
+        if skip:
+            self.stdout.write(f'Пропускаем уже загруженные строки: {skip}')
+        content = importer.ContentImporter(
+            batch_size=options['batch_size'],
+            create_users=options['create_users'],
+        )
+        try:
+            with open(path, newline='', encoding='utf-8') as stream:
+                rows, seconds = content.run(
+                    importer.read_rows(stream, fmt),
+                    skip=skip,
+                    checkpoint=options['checkpoint'],
+                    report=self.report,
+                )
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        self.report(rows, seconds)
+        for number, error in content.errors:
+            self.stderr.write(f'Строка {number}: {error}')
+        created = content.created
+        self.stdout.write(
+            f'Постов: {created["post"]}, '
+            f'комментариев: {created["comment"]}, '
+            f'подписок: {created["follow"]}, '
+            f'ошибок: {len(content.errors)}'
+        )
+        if not options['no_rebuild']:
+            importer.rebuild_derived()
+            self.stdout.write('Счетчики, ленты, поиск и кеш пересобраны.')
+        self.stdout.write(self.style.SUCCESS('Импорт завершен.'))
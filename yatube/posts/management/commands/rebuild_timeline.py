@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок из таблицы Follow.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='Пересобрать ленты только этих пользователей.',
+        )
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = list(
+                User.objects.filter(username__in=options['usernames'])
+            )
+        timeline.rebuild(users)
+        self.stdout.write(self.style.SUCCESS('Ленты подписок пересобраны.'))
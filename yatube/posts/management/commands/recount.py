@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики постов, подписчиков и подписок.'
+
+    def handle(self, *args, **options):
+        fixed = stats.recount()
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено счетчиков: {fixed}.')
+        )
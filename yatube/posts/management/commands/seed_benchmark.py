@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет БД синтетическими пользователями, постами и подписками '
+        'для замеров производительности.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=20,
+            help='Сколько подписок выбирает каждый пользователь.',
+        )
+        parser.add_argument('--comments', type=int, default=0)
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Показатель Ципфа для популярности авторов.',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько дней распределены даты постов.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def report(self, name, done, seconds):
+        self.stdout.write(f'{name}: {done}, {seconds:.1f} с')
+
+    def handle(self, *args, **options):
+        benchmark.seed(
+            users=options['users'],
+            posts=options['posts'],
+            groups=options['groups'],
+            follows=options['follows'],
+            comments=options['comments'],
+            skew=options['skew'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            random_seed=options['seed'],
+            report=self.report,
+        )
+        self.stdout.write(self.style.SUCCESS('Данные для замеров созданы.'))
@@ -0,0 +1,123 @@
+# Generated by Django 2.2.6 on 2026-10-18 17:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_timeline(apps, schema_editor):
+    """Раскладывает посты по лентам уже существующих подписок.
+
+    Авторы, у которых подписчиков больше TIMELINE_FANOUT_LIMIT,
+    отмечаются как авторы без раскладки, как в timeline.rebuild.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    HeavyAuthor = apps.get_model('posts', 'HeavyAuthor')
+    HeavyAuthor.objects.bulk_create(
+        HeavyAuthor(author_id=row['author'])
+        for row in Follow.objects.order_by().values('author').annotate(
+            followers=models.Count('id')
+        ).filter(followers__gt=settings.TIMELINE_FANOUT_LIMIT)
+    )
+
+    def column(model, name):
+        return model._meta.get_field(name).column
+
+    schema_editor.execute(
+        'INSERT INTO {entry} ({entry_user}, {entry_post}, {entry_author}, '
+        '{entry_date}) '
+        'SELECT follow.{follow_user}, post.{post_id}, post.{post_author}, '
+        'post.{post_date} '
+        'FROM {follow} follow '
+        'INNER JOIN {post} post '
+        'ON post.{post_author} = follow.{follow_author} '
+        'WHERE NOT EXISTS (SELECT 1 FROM {heavy} heavy '
+        'WHERE heavy.{heavy_author} = follow.{follow_author})'.format(
+            entry=TimelineEntry._meta.db_table,
+            entry_user=column(TimelineEntry, 'user'),
+            entry_post=column(TimelineEntry, 'post'),
+            entry_author=column(TimelineEntry, 'author'),
+            entry_date=column(TimelineEntry, 'pub_date'),
+            follow=Follow._meta.db_table,
+            follow_user=column(Follow, 'user'),
+            follow_author=column(Follow, 'author'),
+            post=Post._meta.db_table,
+            post_id=column(Post, 'id'),
+            post_author=column(Post, 'author'),
+            post_date=column(Post, 'pub_date'),
+            heavy=HeavyAuthor._meta.db_table,
+            heavy_author=column(HeavyAuthor, 'author'),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0009_merge_0003_auto_20230326_1654_0008_auto_20221123_1649'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='group',
+            name='description',
+            field=models.TextField(help_text='Добавьте описание группы', verbose_name='Описание группы'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='author',
+            field=models.ForeignKey(help_text='Укажите автора статьи', on_delete=django.db.models.deletion.CASCADE, related_name='posts', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='pub_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, help_text='Укажите дату публикации', verbose_name='Дата публикации'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='text',
+            field=models.TextField(help_text='Введите текст поста', verbose_name='Текст поста'),
+        ),
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты подписок',
+                'verbose_name_plural': 'Ленты подписок',
+                'ordering': ['-pub_date', '-post_id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HeavyAuthor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='heavy_author', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Автор без раскладки лент',
+                'verbose_name_plural': 'Авторы без раскладки лент',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'pub_date', 'post'], name='timeline_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'author'], name='timeline_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(fill_timeline, migrations.RunPython.noop),
+    ]
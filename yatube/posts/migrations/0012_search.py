@@ -0,0 +1,62 @@
+# Generated by Django 2.2.6 on 2026-10-18 17:19
+
+from django.db import DatabaseError, migrations, models
+import django.db.models.deletion
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+                "text, group_title, group_description, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                'INSERT INTO posts_post_fts'
+                '(rowid, text, group_title, group_description) '
+                'SELECT posts_post.id, posts_post.text, '
+                "COALESCE(posts_group.title, ''), "
+                "COALESCE(posts_group.description, '') "
+                'FROM posts_post LEFT JOIN posts_group '
+                'ON posts_group.id = posts_post.group_id'
+            )
+    except DatabaseError:
+        # SQLite собран без FTS5, поиск работает по SearchTerm.
+        pass
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_userstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100, verbose_name='Слово')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='Вес')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Слово поиска',
+                'verbose_name_plural': 'Слова поиска',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['term', 'post'], name='search_term_post_idx'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -39,11 +40,16 @@ class Post(models.Model):
         help_text='Введите текст поста',
     )
     pub_date = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         verbose_name='Дата публикации',
         help_text='Укажите дату публикации',
         db_index=True
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -71,10 +77,25 @@ class Post(models.Model):
         ordering = ['-pub_date']
         verbose_name_plural = 'Посты'
         verbose_name = 'Пост'
+        indexes = [
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_date_idx',
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.COEFF_SLICE]
 
+    def save(self, *args, **kwargs):
+        # Сигналы обновляют счетчики в одной транзакции с записью.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     """Модель комментариев."""
@@ -97,13 +118,21 @@ class Comment(models.Model):
     )
     created = models.DateTimeField(
         verbose_name='Дата публикации',
-        auto_now_add=True
+        default=timezone.now,
+        editable=False,
+        db_index=True
     )
 
     class Meta:
         ordering = ['-created']
         verbose_name_plural = 'Комментарии'
         verbose_name = 'Комментарий'
+        indexes = [
+            models.Index(
+                fields=('post', '-created', '-id'),
+                name='comment_post_created_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.COEFF_SLICE]
@@ -127,6 +156,12 @@ class Follow(models.Model):
         ordering = ['-user']
         verbose_name_plural = 'Подписки'
         verbose_name = 'Подписка'
+        indexes = [
+            models.Index(
+                fields=('author', 'user'),
+                name='follow_author_user_idx',
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=('user', 'author'),
@@ -136,3 +171,143 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user} подписался на {self.author}.'
+
+    def save(self, *args, **kwargs):
+        # Сигналы обновляют счетчики в одной транзакции с записью.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class TimelineEntry(models.Model):
+    """Модель записи ленты подписок, раскладывается при публикации поста."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        ordering = ['-pub_date', '-post_id']
+        verbose_name_plural = 'Ленты подписок'
+        verbose_name = 'Запись ленты подписок'
+        indexes = [
+            models.Index(
+                fields=('user', 'pub_date', 'post'),
+                name='timeline_user_date_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='timeline_user_author_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_timeline_entry',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post} в ленте {self.user}'
+
+
+class HeavyAuthor(models.Model):
+    """Модель автора, посты которого не раскладываются по лентам.
+
+    У таких авторов слишком много подписчиков, поэтому их читатели
+    получают ленту подписок прежним запросом через Follow.
+    """
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='heavy_author',
+        verbose_name='Автор',
+    )
+
+    class Meta:
+        verbose_name_plural = 'Авторы без раскладки лент'
+        verbose_name = 'Автор без раскладки лент'
+
+    def __str__(self):
+        return str(self.author)
+
+
+class UserStats(models.Model):
+    """Модель счетчиков пользователя: постов, подписчиков и подписок."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Постов',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Подписчиков',
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Подписок',
+    )
+
+    class Meta:
+        verbose_name_plural = 'Счетчики пользователей'
+        verbose_name = 'Счетчики пользователя'
+
+    def __str__(self):
+        return f'Счетчики {self.user}'
+
+
+class SearchTerm(models.Model):
+    """Модель обратного индекса поиска для БД без FTS5."""
+
+    term = models.CharField(
+        max_length=100,
+        verbose_name='Слово',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Пост',
+    )
+    weight = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Вес',
+    )
+
+    class Meta:
+        verbose_name_plural = 'Слова поиска'
+        verbose_name = 'Слово поиска'
+        indexes = [
+            models.Index(
+                fields=('term', 'post'),
+                name='search_term_post_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.term
@@ -0,0 +1,192 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import (Count, FloatField, OuterRef, Subquery, Sum,
+                              Value)
+from django.db.models.expressions import RawSQL
+
+from .models import Post, SearchTerm
+from .utils import bulk_batch_size
+
+FTS_TABLE = 'posts_post_fts'
+
+WORD_RE = re.compile(r'\w+')
+
+_fts_tables = {}
+
+
+class PostIds(RawSQL):
+    """Подзапрос id постов для фильтра pk__in.
+
+    Django 2.2 сам берет правую часть IN в скобки, а RawSQL добавляет
+    еще одни, и SQLite тогда сравнивает только с первой строкой.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def tokenize(text):
+    max_length = SearchTerm._meta.get_field('term').max_length
+    return [word[:max_length] for word in WORD_RE.findall(text.lower())]
+
+
+def uses_fts():
+    """Проверяет, ведется ли поиск через FTS5 SQLite."""
+    if settings.SEARCH_BACKEND == 'inverted':
+        return False
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias not in _fts_tables:
+        _fts_tables[connection.alias] = (
+            FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[connection.alias]
+
+
+def _document(post):
+    group = post.group
+    return (
+        post.text,
+        group.title if group else '',
+        group.description if group else '',
+    )
+
+
+def index_posts(posts):
+    """Обновляет записи индекса для постов."""
+    posts = list(posts)
+    post_ids = [post.id for post in posts]
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(post_id,) for post_id in post_ids],
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE}'
+                '(rowid, text, group_title, group_description) '
+                'VALUES (%s, %s, %s, %s)',
+                [(post.id, *_document(post)) for post in posts],
+            )
+        return
+    SearchTerm.objects.filter(post_id__in=post_ids).delete()
+    SearchTerm.objects.bulk_create(
+        (
+            SearchTerm(post_id=post.id, term=term, weight=weight)
+            for post in posts
+            for term, weight in Counter(
+                tokenize(' '.join(_document(post)))
+            ).items()
+        ),
+        batch_size=bulk_batch_size(SearchTerm, 1000),
+    )
+
+
+def remove_post(post_id):
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+
+def index_group_posts(post_ids):
+    """Переиндексирует посты после изменения или удаления группы."""
+    posts = Post.objects.select_related('group').filter(pk__in=post_ids)
+    for start in range(0, len(post_ids), 1000):
+        index_posts(posts.filter(pk__in=post_ids[start:start + 1000]))
+
+
+@transaction.atomic
+def rebuild():
+    """Полностью пересобирает поисковый индекс."""
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        SearchTerm.objects.all().delete()
+    posts = Post.objects.select_related('group').order_by('pk')
+    last_pk = 0
+    while True:
+        chunk = list(posts.filter(pk__gt=last_pk)[:1000])
+        if not chunk:
+            break
+        index_posts(chunk)
+        last_pk = chunk[-1].pk
+
+
+def search(query):
+    """Возвращает id найденных постов, лучшие совпадения первыми.
+
+    Ищутся посты, содержащие все слова запроса в тексте, названии
+    или описании группы.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return []
+    limit = settings.SEARCH_MAX_RESULTS
+    if uses_fts():
+        match = ' '.join('"{}"*'.format(term) for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, 4.0, 2.0, 1.0) LIMIT %s',
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+    terms = set(terms)
+    return list(
+        SearchTerm.objects.filter(
+            term__in=terms
+        ).values('post').annotate(
+            matched=Count('term', distinct=True),
+            score=Sum('weight'),
+        ).filter(
+            matched=len(terms)
+        ).order_by(
+            '-score', '-post'
+        ).values_list('post', flat=True)[:limit]
+    )
+
+
+def filter_posts(queryset, query):
+    """Посты queryset, найденные по запросу, без ограничения числа.
+
+    Выборка фильтруется подзапросом к индексу, а поле search_rank
+    упорядочивает лучшие совпадения первыми по убыванию.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return queryset.none().annotate(
+            search_rank=Value(0, output_field=FloatField())
+        )
+    if uses_fts():
+        match = ' '.join('"{}"*'.format(term) for term in terms)
+        matches = PostIds(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match],
+        )
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, 4.0, 2.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid = {Post._meta.db_table}.{Post._meta.pk.column}',
+            [match],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank)
+    terms = set(terms)
+    matches = SearchTerm.objects.filter(
+        term__in=terms
+    ).values('post').annotate(
+        matched=Count('term', distinct=True),
+    ).filter(matched=len(terms)).values('post')
+    rank = SearchTerm.objects.filter(
+        post=OuterRef('pk'), term__in=terms
+    ).values('post').annotate(score=Sum('weight')).values('score')
+    return queryset.filter(pk__in=matches).annotate(
+        search_rank=Subquery(rank, output_field=FloatField())
+    )
@@ -0,0 +1,223 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from . import cache, counts, follows, search, stats, timeline
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+USER_NAME_FIELDS = ('username', 'first_name', 'last_name')
+# Поля группы, которые попадают в поисковый индекс постов.
+GROUP_INDEXED_FIELDS = ('title', 'description')
+# Поля группы, которые выводятся на страницах: название и описание
+# на странице группы, slug в ссылках на нее из постов.
+GROUP_RENDERED_FIELDS = GROUP_INDEXED_FIELDS + ('slug',)
+
+
+def after_commit(func, *args, **kwargs):
+    """Выполняет работу с кешем после коммита записи.
+
+    Иначе другой запрос успеет положить в кеш данные из еще не
+    зафиксированной транзакции, а при откате кеш сбросится зря.
+    """
+    transaction.on_commit(partial(func, *args, **kwargs))
+
+
+def bump_feeds(feeds):
+    for feed, name in feeds:
+        cache.bump_feed(feed, name)
+
+
+def bump_post_feeds(post, group_ids):
+    feeds = [('index_feed', 'all')]
+    feeds += profile_feeds(post.author_id)
+    feeds += [
+        ('group_feed', slug)
+        for slug in Group.objects.filter(
+            pk__in=group_ids - {None}
+        ).values_list('slug', flat=True)
+    ]
+    after_commit(bump_feeds, feeds)
+
+
+def bump_profile_feed(user_id):
+    after_commit(bump_feeds, profile_feeds(user_id))
+
+
+def profile_feeds(user_id):
+    # Имя читается сразу: после коммита пользователь может быть удален.
+    username = User.objects.filter(
+        pk=user_id
+    ).values_list('username', flat=True).first()
+    if username is None:
+        return []
+    return [('profile_feed', username)]
+
+
+def user_names(user):
+    # Отложенные поля не загружаются: их значение считается неизвестным.
+    return tuple(user.__dict__.get(name) for name in USER_NAME_FIELDS)
+
+
+def bump_user(user_id):
+    cache.bump_version('user', user_id)
+    cache.bump_all_feeds()
+
+
+@receiver(post_init, sender=User)
+def user_loaded(sender, instance, **kwargs):
+    """Запоминает имена пользователя, чтобы сбрасывать кеш только
+    при их изменении, а не при смене пароля или last_login."""
+    instance._saved_names = user_names(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    elif user_names(instance) != instance._saved_names:
+        after_commit(bump_user, instance.id)
+    instance._saved_names = user_names(instance)
+
+
+def group_fields(group):
+    # Отложенные поля не загружаются: их значение считается неизвестным.
+    return {name: group.__dict__.get(name) for name in GROUP_RENDERED_FIELDS}
+
+
+@receiver(post_init, sender=Group)
+def group_loaded(sender, instance, **kwargs):
+    """Запоминает поля группы, чтобы переиндексировать посты и сбрасывать
+    кеш только при изменении того, что попадает в поиск и на страницы."""
+    instance._saved_fields = group_fields(instance)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    instance._post_ids = list(instance.posts.values_list('id', flat=True))
+
+
+def group_changed_after_commit(group_id, post_ids):
+    cache.bump_version('group', group_id)
+    cache.bump_all_feeds()
+    if post_ids:
+        search.index_group_posts(post_ids)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    saved = instance._saved_fields
+    instance._saved_fields = group_fields(instance)
+    if created:
+        # У новой группы нет постов, и ее еще нет ни на одной странице.
+        return
+    changed = {
+        name for name, value in instance._saved_fields.items()
+        if value != saved[name]
+    }
+    if not changed:
+        return
+    post_ids = []
+    if changed & set(GROUP_INDEXED_FIELDS):
+        post_ids = list(instance.posts.values_list('id', flat=True))
+    # Переиндексация после коммита не держит транзакцию сохранения
+    # группы и не выполняется, если сохранение откатилось.
+    after_commit(group_changed_after_commit, instance.id, post_ids)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    # Посты отвязаны от группы обновлением без сигналов.
+    after_commit(group_changed_after_commit, instance.id, instance._post_ids)
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    """Запоминает группу поста, чтобы сбросить и ее ленту, если пост
+    перенесут в другую группу."""
+    if 'group_id' in instance.__dict__:
+        instance._saved_group_id = instance.group_id
+
+
+def adjust_group_counts(old_group_id, new_group_id):
+    for group_id, delta in ((old_group_id, -1), (new_group_id, 1)):
+        if group_id:
+            counts.adjust('group', group_id, delta)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        saved_group_id = None
+    elif hasattr(instance, '_saved_group_id'):
+        saved_group_id = instance._saved_group_id
+    else:
+        # Группа не загружалась с постом и не сохранялась вместе с ним.
+        saved_group_id = instance.group_id
+    instance._saved_group_id = instance.group_id
+    after_commit(cache.bump_version, 'post', instance.id)
+    bump_post_feeds(instance, {instance.group_id, saved_group_id})
+    search.index_posts([instance])
+    if created:
+        after_commit(counts.adjust, 'index', 'all', 1)
+        stats.change(instance.author_id, posts_count=1)
+        after_commit(
+            counts.adjust_many, 'follow', timeline.fan_out(instance), 1
+        )
+    if instance.group_id != saved_group_id:
+        after_commit(adjust_group_counts, saved_group_id, instance.group_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    after_commit(cache.bump_version, 'post', instance.id)
+    bump_post_feeds(instance, {instance.group_id})
+    search.remove_post(instance.id)
+    after_commit(counts.adjust, 'index', 'all', -1)
+    after_commit(adjust_group_counts, instance.group_id, None)
+    stats.change(instance.author_id, posts_count=-1)
+    # Записи лент подписчиков удалены каскадом вместе с постом.
+    after_commit(
+        counts.adjust_many,
+        'follow',
+        timeline.feed_followers(instance.author_id),
+        -1,
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """Удаление комментария меняет версию поста и его ETag."""
+    after_commit(cache.bump_version, 'post', instance.post_id)
+
+
+def follows_changed(user_id):
+    follows.invalidate(user_id)
+    counts.expire('follow', user_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        after_commit(follows_changed, instance.user_id)
+        # Профиль подписчика показывает число его подписок.
+        bump_profile_feed(instance.author_id)
+        bump_profile_feed(instance.user_id)
+        stats.change(instance.author_id, followers_count=1)
+        stats.change(instance.user_id, following_count=1)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    after_commit(follows_changed, instance.user_id)
+    bump_profile_feed(instance.author_id)
+    bump_profile_feed(instance.user_id)
+    stats.change(instance.author_id, followers_count=-1)
+    stats.change(instance.user_id, following_count=-1)
+    timeline.cleanup(instance.user_id, instance.author_id)
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Follow, Post, UserStats
+from .utils import bulk_batch_size
+
+User = get_user_model()
+
+COUNTERS = ('posts_count', 'followers_count', 'following_count')
+
+
+def change(user_id, **deltas):
+    """Сдвигает счетчики пользователя на заданные величины.
+
+    Пользователей из bulk_create, импорта и сидера создают без
+    сигнала post_save, и строки счетчиков у них может не быть: тогда
+    она создается пересчетом. При уменьшении строку не создаем —
+    пользователь мог быть удален каскадом в той же транзакции.
+    """
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{name: F(name) + delta for name, delta in deltas.items()}
+    )
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        recount([user_id])
+
+
+def for_user(user):
+    """Счетчики пользователя, с созданием недостающей строки."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        recount([user.pk])
+        user.stats = UserStats.objects.get(user=user)
+        return user.stats
+
+
+def _count_by(queryset, field, user_ids):
+    if user_ids is not None:
+        queryset = queryset.filter(**{f'{field}__in': user_ids})
+    return dict(
+        queryset.order_by().values_list(field).annotate(Count('id'))
+    )
+
+
+@transaction.atomic
+def recount(user_ids=None):
+    """Пересчитывает счетчики и возвращает число исправленных строк."""
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    counts = {
+        'posts_count': _count_by(Post.objects, 'author', user_ids),
+        'followers_count': _count_by(Follow.objects, 'author', user_ids),
+        'following_count': _count_by(Follow.objects, 'user', user_ids),
+    }
+    current = {
+        stats.user_id: stats
+        for stats in UserStats.objects.filter(user__in=users)
+    }
+    created, changed = [], []
+    for user_id in users.values_list('id', flat=True).iterator():
+        values = {
+            name: counts[name].get(user_id, 0) for name in COUNTERS
+        }
+        stats = current.get(user_id)
+        if stats is None:
+            created.append(UserStats(user_id=user_id, **values))
+        elif any(getattr(stats, name) != values[name] for name in COUNTERS):
+            for name, value in values.items():
+                setattr(stats, name, value)
+            changed.append(stats)
+    UserStats.objects.bulk_create(
+        created,
+        batch_size=bulk_batch_size(UserStats, 1000),
+        ignore_conflicts=True,
+    )
+    UserStats.objects.bulk_update(changed, COUNTERS, batch_size=1000)
+    return len(created) + len(changed)
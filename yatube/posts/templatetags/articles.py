@@ -0,0 +1,10 @@
+from django import template
+
+from posts.cache import render_article
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def article(context, post, **flags):
+    return render_article(post, context.get('request'), **flags)
@@ -0,0 +1,10 @@
+from django import template
+
+from posts.thumbnails import get_cached_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def cached_thumbnail(file_, geometry, **options):
+    return get_cached_thumbnail(file_, geometry, **options)
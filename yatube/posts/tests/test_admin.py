@@ -0,0 +1,126 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import stats
+from posts.models import Comment, Group, Post
+from posts.utils import EstimatedCountPaginator
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.admin,
+            group=cls.group,
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.admin, text='Комментарий'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self, model_name):
+        url = reverse(f'admin:posts_{model_name}_changelist')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_changelist_queries_do_not_grow(self):
+        """Число запросов списка не зависит от числа строк."""
+        for model_name in ('post', 'comment'):
+            with self.subTest(model_name=model_name):
+                before = self.changelist_queries(model_name)
+                author = User.objects.create_user(
+                    username=f'auth_{model_name}'
+                )
+                group = Group.objects.create(
+                    title='Другая группа', slug=f'other-{model_name}'
+                )
+                post = Post.objects.create(
+                    text='Другой текст', author=author, group=group
+                )
+                Comment.objects.create(
+                    post=post, author=author, text='Другой комментарий'
+                )
+                self.assertEqual(self.changelist_queries(model_name), before)
+
+    def test_group_not_rendered_as_select(self):
+        """Группы не выводятся выпадающим списком в каждой строке."""
+        other = Group.objects.create(title='Лишняя группа', slug='other')
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertContains(response, self.group.title)
+        self.assertNotContains(response, other.title)
+
+    def test_date_hierarchy(self):
+        """Список постов фильтруется по году публикации."""
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'),
+            {'pub_date__year': self.post.pub_date.year},
+        )
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.post])
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(text=f'Текст {i}', author=cls.author) for i in range(5)
+        )
+
+    def test_exact_count_below_limit(self):
+        """До лимита число записей считается точно."""
+        paginator = EstimatedCountPaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.count, 5)
+        self.assertEqual(paginator.num_pages, 3)
+
+    @override_settings(ESTIMATED_COUNT_LIMIT=3)
+    def test_estimated_count_above_limit(self):
+        """Выше лимита число записей оценивается, а не считается,
+        в том числе для отфильтрованной выборки."""
+        posts = Post.objects.all()
+        cases = {
+            'all': posts,
+            'filtered': posts.filter(author=self.author),
+        }
+        for name, queryset in cases.items():
+            with self.subTest(name=name):
+                with CaptureQueriesContext(connection) as queries:
+                    paginator = EstimatedCountPaginator(queryset, 2)
+                    self.assertEqual(paginator.count, 5)
+                for query in queries:
+                    self.assertNotIn(
+                        'COUNT(*) FROM "posts_post"', query['sql']
+                    )
+
+    @override_settings(ESTIMATED_COUNT_LIMIT=3)
+    def test_estimate_skips_deleted_keys(self):
+        """Пропуски первичных ключей после удалений не завышают
+        оценку."""
+        Post.objects.bulk_create(
+            Post(text=f'Новый {i}', author=self.author) for i in range(5)
+        )
+        stats.recount()
+        oldest = Post.objects.order_by('pk').values_list('pk', flat=True)[:5]
+        Post.objects.filter(pk__in=list(oldest)).delete()
+        paginator = EstimatedCountPaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.count, 5)
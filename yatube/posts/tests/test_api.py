@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Follow, Group, Post
+from posts.tests.utils import run_on_commit
+
+User = get_user_model()
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+            group=cls.group,
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_feeds(self):
+        """Ленты отдаются в JSON с данными поста."""
+        urls = (
+            reverse('posts:api_index'),
+            reverse('posts:api_group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:api_profile', kwargs={'username': 'auth'}),
+            reverse('posts:api_follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                results = response.json()['results']
+                self.assertEqual(len(results), 1)
+                self.assertEqual(results[0]['id'], self.post.id)
+                self.assertEqual(results[0]['text'], 'Тестовый текст')
+                self.assertEqual(results[0]['author'], 'auth')
+                self.assertEqual(results[0]['group'], 'test-slug')
+
+    def test_follow_requires_login(self):
+        """Лента подписок доступна только авторизованным."""
+        response = Client().get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(NUM_OF_POST=1)
+    def test_cursor_pagination(self):
+        """Следующая страница открывается по курсору из ответа."""
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        data = self.client.get(reverse('posts:api_index')).json()
+        self.assertEqual([row['id'] for row in data['results']], [post.id])
+        self.assertIsNone(data['previous'])
+        data = self.client.get(data['next']).json()
+        self.assertEqual(
+            [row['id'] for row in data['results']], [self.post.id]
+        )
+        self.assertIsNone(data['next'])
+
+    def test_not_modified(self):
+        """Неизменная страница отдается ответом 304 по ETag."""
+        url = reverse('posts:api_index')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Измененный текст'
+        with run_on_commit():
+            post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        with run_on_commit():
+            Post.objects.create(text='Новый пост', author=self.author)
+        self.assertNotEqual(
+            self.client.get(url)['ETag'], response['ETag']
+        )
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count
+from django.test import TestCase
+from posts import benchmark
+from posts.cache import feed_stats
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        benchmark.seed(users=30, posts=200, groups=3, follows=5, comments=20)
+
+    def test_seed(self):
+        """Данные создаются вместе с лентами и счетчиками."""
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertTrue(
+            User.objects.filter(username=benchmark.BENCHMARK_USERNAME)
+            .exists()
+        )
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+
+    def test_skewed_authors(self):
+        """Посты распределены по авторам неравномерно."""
+        counts = Post.objects.order_by().values('author').annotate(
+            total=Count('id')
+        ).values_list('total', flat=True)
+        self.assertGreater(max(counts), 3 * 200 / User.objects.count())
+
+    def test_run(self):
+        """Отчет содержит перцентили, запросы и память для всех адресов."""
+        report = benchmark.run(iterations=3, warmup=0, memory_iterations=1)
+        self.assertEqual(report['meta']['posts'], 200)
+        for name in ('index', 'group_list', 'profile', 'post_detail',
+                     'follow_index', 'search', 'api_index'):
+            with self.subTest(name=name):
+                result = report['results'][name]
+                self.assertEqual(result['status'], 200)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertGreater(result['queries'], 0)
+                self.assertGreater(result['peak_kib'], 0)
+
+    def test_run_bypasses_feed_cache(self):
+        """Замеры лент проходят мимо кеша страниц, если его не включить."""
+        cache.clear()
+        benchmark.run(iterations=2, warmup=1, memory_iterations=0,
+                      names=['index'])
+        self.assertEqual(feed_stats()['hits'], 0)
+        benchmark.run(iterations=2, warmup=1, memory_iterations=0,
+                      names=['index'], feed_cache=True)
+        self.assertGreater(feed_stats()['hits'], 0)
+
+    def test_compare(self):
+        """Регрессией считается рост p95 выше порога или числа запросов."""
+        baseline = {'results': {
+            'index': {'p95_ms': 10.0, 'queries': 3},
+            'profile': {'p95_ms': 10.0, 'queries': 3},
+            'search': {'p95_ms': 10.0, 'queries': 3},
+        }}
+        report = {'results': {
+            'index': {'p95_ms': 10.5, 'queries': 3},
+            'profile': {'p95_ms': 12.0, 'queries': 3},
+            'search': {'p95_ms': 9.0, 'queries': 4},
+        }}
+        lines, regressions = benchmark.compare(report, baseline, 10)
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(regressions, ['profile', 'search'])
+
+    def test_percentile(self):
+        """Перцентиль считается по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([5], 95), 5)
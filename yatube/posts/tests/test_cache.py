@@ -0,0 +1,209 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.contrib.auth.models import AnonymousUser
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.cache import (_feed_scope, article_stats, cached_response,
+                         feed_stats, get_versions, prefetch_articles,
+                         render_article, should_refresh)
+from posts.models import Group, Post
+from posts.tests.utils import run_on_commit
+
+User = get_user_model()
+
+
+class ArticleCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='test-slug',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            group=cls.group,
+            author=cls.user,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_article_served_from_cache(self):
+        """Повторный вывод поста берется из кеша фрагментов."""
+        self.guest_client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        )
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertIn('Тестовый текст', render_article(post, group_list=True))
+        self.assertEqual(article_stats()['hits'], 1)
+        self.assertEqual(article_stats()['misses'], 1)
+
+    def test_page_misses_passed_at_once(self):
+        """Промахи фрагментов страницы передаются в missing разом,
+        а при попаданиях missing не вызывается."""
+        Post.objects.create(text='Второй пост', author=self.user)
+        for expected in (2, 0):
+            with self.subTest(misses=expected):
+                posts = list(Post.objects.select_related('author', 'group'))
+                missing = mock.Mock()
+                prefetch_articles(posts, missing)
+                for post in posts:
+                    render_article(post, article_adress=True)
+                if expected:
+                    missing.assert_called_once_with(posts)
+                else:
+                    missing.assert_not_called()
+
+    def test_page_round_trips(self):
+        """Страница из кеша фрагментов читается двумя обращениями
+        к кешу и одним увеличением счетчика, а не по несколько на пост."""
+        for number in range(4):
+            Post.objects.create(text=f'Пост {number}', author=self.user)
+        for expected in ('misses', 'hits'):
+            posts = list(Post.objects.select_related('author', 'group'))
+            prefetch_articles(posts)
+            with mock.patch.object(
+                cache, 'get_many', wraps=cache.get_many
+            ) as get_many, mock.patch.object(
+                cache, 'incr', wraps=cache.incr
+            ) as incr:
+                for post in posts:
+                    render_article(post, article_adress=True)
+            with self.subTest(expected=expected):
+                self.assertEqual(get_many.call_count, 2)
+                self.assertEqual(incr.call_count, 1)
+        self.assertEqual(article_stats()['hits'], len(posts))
+
+    def test_article_rendered_per_viewer_role(self):
+        """Фрагмент рендерится с запросом и делится только зрителями
+        одной роли."""
+        reader = User.objects.create_user(username='reader')
+        viewers = (AnonymousUser(), reader, self.user, reader)
+        for user in viewers:
+            request = RequestFactory().get('/')
+            request.user = user
+            render_article(self.post, request, article_adress=True)
+        self.assertEqual(article_stats()['misses'], 3)
+        self.assertEqual(article_stats()['hits'], 1)
+
+    def test_article_invalidated(self):
+        """Фрагмент сбрасывается при изменении поста, имени автора
+        и адреса группы."""
+        changes = (
+            (Post, 'text', 'Новый текст'),
+            (User, 'first_name', 'Лев'),
+            (Group, 'slug', 'new-slug'),
+        )
+        for model, field, value in changes:
+            with self.subTest(field=field):
+                render_article(self.post, article_adress=True)
+                obj = model.objects.get()
+                setattr(obj, field, value)
+                with run_on_commit():
+                    obj.save()
+                post = Post.objects.select_related(
+                    'author', 'group'
+                ).get(pk=self.post.pk)
+                self.assertIn(
+                    value, render_article(post, article_adress=True)
+                )
+
+    def test_user_save_without_rename(self):
+        """Смена пароля и входа не сбрасывает ленты, переименование
+        сбрасывает."""
+        user = User.objects.get(pk=self.user.pk)
+        versions = get_versions(('feeds', 'all'), ('user', user.pk))
+        with run_on_commit():
+            user.set_password('new-password')
+            user.save()
+            user.last_login = user.date_joined
+            user.save(update_fields=['last_login'])
+        self.assertEqual(
+            get_versions(('feeds', 'all'), ('user', user.pk)), versions
+        )
+        user.first_name = 'Лев'
+        with run_on_commit():
+            user.save()
+        self.assertNotEqual(
+            get_versions(('feeds', 'all'), ('user', user.pk)), versions
+        )
+
+    def test_post_save_without_group_query(self):
+        """Сохранение поста не перечитывает его прежнюю группу, но
+        сбрасывает ленту старой группы при переносе."""
+        other = Group.objects.create(title='Другая', slug='other')
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = other
+        versions = get_versions(('group_feed', _feed_scope('test-slug')))
+        with run_on_commit():
+            with CaptureQueriesContext(connection) as queries:
+                post.save()
+        for query in queries:
+            self.assertFalse(
+                query['sql'].startswith('SELECT "posts_post"."group_id"')
+            )
+        self.assertNotEqual(
+            get_versions(('group_feed', _feed_scope('test-slug'))), versions
+        )
+
+
+class FeedCacheTests(TestCase):
+    key = 'feed:test'
+
+    def setUp(self):
+        cache.clear()
+
+    def build(self, content):
+        return lambda: HttpResponse(content)
+
+    def test_fresh_page_served_from_cache(self):
+        """Свежая страница отдается из кеша без пересборки."""
+        cached_response(self.key, self.build('первая'))
+        response = cached_response(self.key, self.build('вторая'))
+        self.assertEqual(response.content.decode(), 'первая')
+        self.assertEqual(feed_stats()['regenerations'], 1)
+        self.assertEqual(feed_stats()['hits'], 1)
+
+    @override_settings(CACHE_TIMEOUT=-1)
+    def test_stale_page_served_while_locked(self):
+        """Пока страница пересобирается, отдается устаревшая копия."""
+        cached_response(self.key, self.build('старая'))
+        cache.add(f'lock:{self.key}', 1)
+        response = cached_response(self.key, self.build('новая'))
+        self.assertEqual(response.content.decode(), 'старая')
+        self.assertEqual(feed_stats()['stale'], 1)
+        cache.delete(f'lock:{self.key}')
+        response = cached_response(self.key, self.build('новая'))
+        self.assertEqual(response.content.decode(), 'новая')
+        self.assertEqual(feed_stats()['regenerations'], 2)
+
+    @override_settings(FEED_LOCK_WAIT=0)
+    def test_lock_wait_without_copy(self):
+        """Без копии в кеше процесс ждет пересборки другим процессом."""
+        cache.add(f'lock:{self.key}', 1)
+        response = cached_response(self.key, self.build('новая'))
+        self.assertEqual(response.content.decode(), 'новая')
+        self.assertEqual(feed_stats()['lock_waits'], 1)
+
+    def test_early_refresh(self):
+        """Долго собираемая страница обновляется до срока годности."""
+        now = time.time()
+        with override_settings(FEED_EARLY_REFRESH_BETA=0):
+            self.assertFalse(
+                should_refresh({'expires': now + 1, 'delta': 10}, now)
+            )
+        with override_settings(FEED_EARLY_REFRESH_BETA=1e9):
+            self.assertTrue(
+                should_refresh({'expires': now + 1, 'delta': 10}, now)
+            )
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+from posts.models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.urls = {
+            'post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.id}
+            ),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': 'auth'}
+            ),
+        }
+
+    def assertNotModified(self, url, etag, expected=True):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code == 304, expected)
+        return response
+
+    def test_not_modified(self):
+        """Неизменные страницы отдаются ответом 304 одним запросом
+        без загрузки постов."""
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                response = self.client.get(url)
+                self.assertIn('Last-Modified', response)
+                with CaptureQueriesContext(connection) as context:
+                    self.assertNotModified(url, response['ETag'])
+                posts_queries = [
+                    query for query in context.captured_queries
+                    if '"posts_' in query['sql']
+                ]
+                self.assertEqual(len(posts_queries), 1)
+
+    def test_if_modified_since(self):
+        """Запрос с If-Modified-Since получает 304 по дате изменения."""
+        post = Post.objects.get(pk=self.post.pk)
+        response = self.client.get(
+            self.urls['post_detail'],
+            HTTP_IF_MODIFIED_SINCE=http_date(post.updated_at.timestamp()),
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate(self):
+        """Правка поста, комментарии, новые посты и подписки меняют ETag."""
+        changes = {
+            'edit': lambda: Post.objects.get(pk=self.post.pk).save(),
+            'comment': lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            ),
+            'delete_comment': lambda: Comment.objects.filter(
+                post=self.post
+            ).delete(),
+            'new_post': lambda: Post.objects.create(
+                text='Новый пост', author=self.author
+            ),
+            'follow': lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            ),
+        }
+        affected = {
+            'edit': ('post_detail', 'profile'),
+            'comment': ('post_detail',),
+            'delete_comment': ('post_detail',),
+            'new_post': ('post_detail', 'profile'),
+            'follow': ('profile',),
+        }
+        for change, apply in changes.items():
+            etags = {
+                name: self.client.get(url)['ETag']
+                for name, url in self.urls.items()
+            }
+            apply()
+            for name in affected[change]:
+                with self.subTest(change=change, name=name):
+                    self.assertNotModified(
+                        self.urls[name], etags[name], expected=False
+                    )
+
+    def test_etag_depends_on_user(self):
+        """Другой пользователь не получает 304 по чужому ETag."""
+        etag = self.client.get(self.urls['profile'])['ETag']
+        response = Client().get(self.urls['profile'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,148 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import counts
+from posts.models import Follow, Group, Post, TimelineEntry
+from posts.tests.utils import run_on_commit
+
+User = get_user_model()
+
+
+@override_settings(NUM_OF_POST=2)
+class FeedCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for index in range(5):
+            Post.objects.create(
+                text=f'Пост {index}', author=cls.author, group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        counted = any('COUNT(' in query['sql'] for query in queries)
+        return response, counted
+
+    def test_miss_counts_limited_and_schedules(self):
+        """Без кеша число примерное, точное считается в фоне."""
+        response, counted = self.get_index()
+        self.assertTrue(counted)
+        self.assertTrue(response.context['page_obj'].paginator.approximate)
+        self.assertNotContains(response, 'Последняя')
+        self.assertEqual(
+            counts.get_count('index', 'all', Post.objects.all()), (5, False)
+        )
+        key = counts._key('index', 'all')
+        self.assertIsNotNone(cache.get(f'{key}:pending'))
+
+    def test_cached_count_skips_count_query(self):
+        """Точное число из кеша, COUNT(*) при открытии не выполняется."""
+        counts.refresh(counts._key('index', 'all'), Post.objects.all())
+        response, counted = self.get_index()
+        self.assertFalse(counted)
+        self.assertEqual(response.context['page_obj'].paginator.count, 5)
+        self.assertFalse(response.context['page_obj'].paginator.approximate)
+        self.assertContains(response, 'Последняя')
+
+    def test_signals_adjust_counts(self):
+        """Новый, перенесенный и удаленный пост сдвигают счетчики."""
+        other = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        for feed, name, queryset in (
+            ('index', 'all', Post.objects.all()),
+            ('group', self.group.pk, self.group.posts.all()),
+            ('group', other.pk, other.posts.all()),
+        ):
+            counts.refresh(counts._key(feed, name), queryset)
+        with run_on_commit():
+            post = Post.objects.create(
+                text='Новый', author=self.author, group=self.group
+            )
+            post.group = other
+            post.save()
+        expected = (
+            (('index', 'all'), 6),
+            (('group', self.group.pk), 5),
+            (('group', other.pk), 1),
+        )
+        for (feed, name), count in expected:
+            with self.subTest(feed=feed, name=name):
+                self.assertEqual(
+                    counts.get_count(feed, name, Post.objects.none()),
+                    (count, True),
+                )
+        with run_on_commit():
+            post.delete()
+        self.assertEqual(
+            counts.get_count('group', other.pk, Post.objects.none()),
+            (0, True),
+        )
+
+    def test_follow_counts_follow_timeline(self):
+        """Новый и удаленный пост сдвигают число записей в лентах
+        подписок подписчиков автора."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        entries = TimelineEntry.objects.filter(user=reader)
+        counts.refresh(counts._key('follow', reader.pk), entries)
+        with run_on_commit():
+            post = Post.objects.create(text='Новый', author=self.author)
+        self.assertEqual(
+            counts.get_count('follow', reader.pk, entries), (6, True)
+        )
+        with run_on_commit():
+            post.delete()
+        self.assertEqual(
+            counts.get_count('follow', reader.pk, entries), (5, True)
+        )
+        self.assertEqual(entries.count(), 5)
+
+    def test_expired_count_is_approximate(self):
+        """Устаревшее число отдается как примерное до пересчета."""
+        key = counts._key('index', 'all')
+        with override_settings(FEED_COUNT_TIMEOUT=-1):
+            counts.refresh(key, Post.objects.all())
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                counts.get_count('index', 'all', Post.objects.all()),
+                (5, False),
+            )
+
+
+class BackgroundCountTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        counts.get_executor().shutdown(wait=True)
+        counts._executor = None
+
+    def test_refresh_runs_in_background(self):
+        """Точный подсчет выполняется в фоновом потоке после коммита."""
+        author = User.objects.create_user(username='author')
+        for index in range(3):
+            Post.objects.create(text=f'Пост {index}', author=author)
+        counts.get_count('index', 'all', Post.objects.all())
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            count = counts.get_count('index', 'all', Post.objects.none())
+            if count[1]:
+                break
+            time.sleep(0.01)
+        self.assertEqual(count, (3, True))
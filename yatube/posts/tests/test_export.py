@@ -0,0 +1,107 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ExportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+            group=cls.group,
+        )
+        cls.other_post = Post.objects.create(
+            text='Другой текст',
+            author=cls.staff,
+        )
+        Comment.objects.create(post=cls.post, author=cls.staff, text='Ок')
+
+    def setUp(self):
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def rows(self, content):
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_export_command(self):
+        """Команда выгружает все посты по возрастанию id."""
+        out = StringIO()
+        call_command('export_posts', '--chunk-size', '1', stdout=out)
+        rows = self.rows(out.getvalue())
+        self.assertEqual(
+            [row['id'] for row in rows], [self.post.id, self.other_post.id]
+        )
+        self.assertEqual(rows[0]['author'], 'auth')
+        self.assertEqual(rows[0]['group'], 'test-slug')
+        self.assertEqual(rows[0]['comments_count'], 1)
+        self.assertIsNone(rows[1]['group'])
+
+    def test_export_command_gzip(self):
+        """Команда сжимает выгрузку в файл."""
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        path = os.path.join(tmp_dir, 'posts.ndjson.gz')
+        call_command('export_posts', '--gzip', '--output', path)
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            self.assertEqual(len(self.rows(file.read())), 2)
+
+    def test_export_filters(self):
+        """Выгрузка фильтруется по группе, автору и датам."""
+        year = self.post.pub_date.year
+        cases = {
+            (('group', 'test-slug'),): [self.post.id],
+            (('author', 'staff'),): [self.other_post.id],
+            (('since', f'{year + 1}-01-01'),): [],
+            (('until', f'{year + 1}-01-01'),): [
+                self.post.id, self.other_post.id
+            ],
+        }
+        for params, expected in cases.items():
+            with self.subTest(params=params):
+                response = self.staff_client.get(
+                    reverse('posts:export_posts'), dict(params)
+                )
+                content = b''.join(response.streaming_content).decode()
+                self.assertEqual(
+                    [row['id'] for row in self.rows(content)], expected
+                )
+
+    def test_export_endpoint_gzip(self):
+        """При ?gzip=1 ответ сжимается на лету."""
+        response = self.staff_client.get(
+            reverse('posts:export_posts'), {'gzip': 1}
+        )
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(len(self.rows(content.decode())), 2)
+
+    def test_export_endpoint_staff_only(self):
+        """Выгрузка доступна только персоналу."""
+        client = Client()
+        client.force_login(self.author)
+        response = client.get(reverse('posts:export_posts'))
+        self.assertEqual(response.status_code, 302)
+        response = self.staff_client.get(
+            reverse('posts:export_posts'), {'since': 'вчера'}
+        )
+        self.assertEqual(response.status_code, 400)
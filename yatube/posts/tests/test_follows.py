@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts import follows
+from posts.follows import is_following
+from posts.importer import rebuild_derived
+from posts.models import Follow
+from posts.tests.utils import run_on_commit
+
+User = get_user_model()
+
+
+class FollowCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author_{index}')
+            for index in range(3)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+        Follow.objects.create(user=cls.reader, author=cls.authors[2])
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def author_ids(self):
+        return [author.pk for author in self.authors]
+
+    def test_batch_check_uses_one_query(self):
+        """Пакетная проверка делает один запрос, затем берет кеш."""
+        expected = dict(zip(self.author_ids(), (True, False, True)))
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                is_following(self.reader, self.author_ids()), expected
+            )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                is_following(self.reader, self.author_ids()), expected
+            )
+            self.assertEqual(
+                follows.following_ids(self.reader),
+                {self.authors[0].pk, self.authors[2].pk},
+            )
+
+    def test_anonymous(self):
+        """Анонимный пользователь ни на кого не подписан."""
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                is_following(AnonymousUser(), self.author_ids()),
+                dict.fromkeys(self.author_ids(), False),
+            )
+
+    def test_follow_and_unfollow_update_cache(self):
+        """Подписка, отписка и удаление подписки обновляют кеш."""
+        author = self.authors[1]
+        is_following(self.reader, [author.pk])
+        with run_on_commit():
+            self.reader_client.get(
+                reverse('posts:profile_follow', args=[author.username])
+            )
+        self.assertTrue(is_following(self.reader, [author.pk])[author.pk])
+        with run_on_commit():
+            self.reader_client.get(
+                reverse('posts:profile_unfollow', args=[author.username])
+            )
+        self.assertFalse(is_following(self.reader, [author.pk])[author.pk])
+        with run_on_commit():
+            User.objects.filter(pk=self.authors[0].pk).delete()
+        self.assertEqual(
+            follows.following_ids(self.reader), {self.authors[2].pk}
+        )
+
+    def test_bulk_changes_reset_cache(self):
+        """Пересборка после массовой загрузки сбрасывает кеш всех."""
+        author = self.authors[1]
+        is_following(self.reader, [author.pk])
+        Follow.objects.bulk_create([Follow(user=self.reader, author=author)])
+        rebuild_derived()
+        self.assertTrue(is_following(self.reader, [author.pk])[author.pk])
+
+    def test_profile_button(self):
+        """Кнопка подписки в профиле берет состояние из кеша."""
+        for author, following in ((self.authors[0], True),
+                                  (self.authors[1], False)):
+            with self.subTest(author=author.username):
+                response = self.reader_client.get(
+                    reverse('posts:profile', args=[author.username])
+                )
+                self.assertEqual(response.context['following'], following)
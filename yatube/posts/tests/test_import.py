@@ -0,0 +1,170 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from posts import search
+from posts.models import (Comment, Follow, Group, Post, TimelineEntry,
+                          UserStats)
+
+User = get_user_model()
+
+
+class ImportContentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def import_content(self, path, *args):
+        stderr = StringIO()
+        call_command(
+            'import_content', path, *args, stdout=StringIO(), stderr=stderr
+        )
+        return stderr.getvalue()
+
+    def test_import_ndjson(self):
+        """Команда загружает посты, комментарии и подписки из NDJSON
+        и пересобирает производные данные."""
+        rows = [
+            {'type': 'post', 'id': 100, 'author': 'auth',
+             'group': 'test-slug', 'text': 'Импортированный пост',
+             'pub_date': '2020-01-02T03:04:05'},
+            {'type': 'comment', 'post': 100, 'author': 'reader',
+             'text': 'Комментарий'},
+            {'type': 'follow', 'user': 'reader', 'author': 'auth'},
+            {'type': 'post', 'author': 'nobody', 'text': 'Ошибка'},
+        ]
+        path = self.write(
+            'content.ndjson', '\n'.join(json.dumps(row) for row in rows)
+        )
+        self.import_content(path, '--batch-size', '2')
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertTrue(Comment.objects.filter(post=post).exists())
+        self.assertTrue(
+            Follow.objects.filter(user=self.reader, author=self.author)
+            .exists()
+        )
+        self.assertFalse(Post.objects.filter(text='Ошибка').exists())
+        self.assertEqual(User.objects.get(pk=self.author.pk)
+                         .stats.posts_count, 1)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post)
+            .exists()
+        )
+        self.assertEqual(search.search('импортированный'), [100])
+
+    def test_import_csv_creates_users(self):
+        """CSV загружается, неизвестные авторы создаются по флагу."""
+        path = self.write(
+            'content.csv',
+            'type,id,author,group,text,pub_date\n'
+            'post,,newbie,,Пост из CSV,\n',
+        )
+        self.import_content(path, '--create-users')
+        self.assertTrue(
+            Post.objects.filter(
+                author__username='newbie', text='Пост из CSV'
+            ).exists()
+        )
+
+    def test_invalid_references_reported(self):
+        """Занятые id и комментарии к несуществующим постам попадают
+        в ошибки, остальные строки загружаются."""
+        existing = Post.objects.create(text='Старый пост', author=self.author)
+        rows = [
+            {'type': 'post', 'id': existing.pk, 'author': 'auth',
+             'text': 'Дубликат'},
+            {'type': 'post', 'id': 200, 'author': 'auth', 'text': 'Новый'},
+            {'type': 'post', 'id': 200, 'author': 'auth', 'text': 'Повтор'},
+            {'type': 'comment', 'post': 999, 'author': 'reader',
+             'text': 'Без поста'},
+            {'type': 'comment', 'post': 200, 'author': 'reader',
+             'text': 'К новому посту'},
+        ]
+        path = self.write(
+            'content.ndjson', '\n'.join(json.dumps(row) for row in rows)
+        )
+        errors = self.import_content(path, '--no-rebuild')
+        self.assertEqual(Post.objects.get(pk=existing.pk).text, 'Старый пост')
+        self.assertEqual(Post.objects.get(pk=200).text, 'Новый')
+        self.assertEqual(
+            list(Comment.objects.values_list('post_id', flat=True)), [200]
+        )
+        for number in (1, 3, 4):
+            with self.subTest(number=number):
+                self.assertIn(f'Строка {number}:', errors)
+
+    def test_malformed_lines_reported(self):
+        """Строки с неверным JSON и не объекты попадают в ошибки,
+        остальные строки загружаются."""
+        lines = [
+            json.dumps({'type': 'post', 'author': 'auth', 'text': 'Первый'}),
+            '{"type": "post",',
+            json.dumps(['post', 'auth']),
+            json.dumps({'type': 'post', 'author': 'auth', 'text': 'Второй'}),
+        ]
+        path = self.write('content.ndjson', '\n'.join(lines))
+        errors = self.import_content(path, '--no-rebuild')
+        self.assertEqual(
+            set(Post.objects.values_list('text', flat=True)),
+            {'Первый', 'Второй'},
+        )
+        for number in (2, 3):
+            with self.subTest(number=number):
+                self.assertIn(f'Строка {number}:', errors)
+
+    def test_created_users_have_stats(self):
+        """Созданные импортом пользователи получают строку счетчиков
+        и без пересборки."""
+        path = self.write(
+            'content.csv',
+            'type,id,author,group,text,pub_date\n'
+            'post,,newbie,,Пост из CSV,\n',
+        )
+        self.import_content(path, '--create-users', '--no-rebuild')
+        self.assertTrue(
+            UserStats.objects.filter(user__username='newbie').exists()
+        )
+
+    def test_resume_from_checkpoint(self):
+        """Импорт продолжается со строки из файла контрольной точки."""
+        path = self.write(
+            'content.ndjson',
+            '\n'.join(
+                json.dumps({'type': 'post', 'author': 'auth',
+                            'text': f'Пост {i}'})
+                for i in range(3)
+            ),
+        )
+        checkpoint = self.write('checkpoint', '2')
+        self.import_content(path, '--checkpoint', checkpoint, '--no-rebuild')
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Пост 2']
+        )
+        with open(checkpoint) as file:
+            self.assertEqual(file.read(), '3')
@@ -0,0 +1,148 @@
+import json
+import re
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template.base import Template
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+JINJA2_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+)
+CSRF_TOKEN = re.compile(r'name="csrfmiddlewaretoken" value="\w+"')
+
+
+def normalize(html):
+    html = CSRF_TOKEN.sub('name="csrfmiddlewaretoken"', html)
+    html = re.sub(r'\s+', ' ', html)
+    return re.sub(r'>\s+<', '><', html).strip()
+
+
+@override_settings(NUM_OF_POST=2, NUM_OF_COMMENTS=2)
+class JinjaTemplatesTests(TestCase):
+    """Шаблоны jinja2/ выводят тот же HTML, что и templates/."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа <b>',
+            slug='group',
+            description='Первая строка\nвторая & строка',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {index}\n<script>x</script>',
+                author=cls.author,
+                group=cls.group if index % 2 else None,
+            )
+            for index in range(3)
+        ]
+        cls.post = cls.posts[-1]
+        for index in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Строка\n{index}'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def pages(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+        )
+
+    def render(self, client, url, views):
+        cache.clear()
+        with override_settings(JINJA2_VIEWS=views):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_same_html(self):
+        """Django и Jinja2 выводят страницы одинаково."""
+        clients = (
+            ('guest', self.guest_client),
+            ('reader', self.authorized_client),
+            ('author', self.author_client),
+        )
+        for name, client in clients:
+            for url in self.pages():
+                if name == 'guest' and url == self.pages()[-1]:
+                    continue
+                with self.subTest(client=name, url=url):
+                    django = self.render(client, url, ())
+                    jinja = self.render(client, url, JINJA2_VIEWS)
+                    self.assertEqual(
+                        normalize(jinja.content.decode()),
+                        normalize(django.content.decode()),
+                    )
+
+    def test_engine_switch(self):
+        """JINJA2_VIEWS выбирает шаблонизатор для представления."""
+        url = reverse('posts:index')
+        response = self.render(self.guest_client, url, ('posts:index',))
+        self.assertIn('/jinja2/', response.templates[0].origin.name)
+        self.assertEqual(response.context['page_obj'].number, 1)
+        response = self.render(self.guest_client, url, ())
+        self.assertIn('/templates/', response.templates[0].origin.name)
+
+    def test_no_signal_outside_tests(self):
+        """Вне тестового окружения шаблоны Jinja2 не отправляют
+        template_rendered."""
+        url = reverse('posts:index')
+        with mock.patch.object(
+            Template,
+            '_render',
+            lambda template, context: template.nodelist.render(context),
+        ):
+            response = self.render(self.guest_client, url, ('posts:index',))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.templates, [])
+
+    def test_benchmark_templates(self):
+        """Замер рендера сравнивает оба шаблонизатора на всех страницах."""
+        out = StringIO()
+        call_command(
+            'benchmark_templates',
+            '--iterations=2',
+            '--warmup=0',
+            '--no-fragment-cache',
+            '--json',
+            stdout=out,
+        )
+        results = json.loads(out.getvalue())
+        self.assertEqual(
+            [row['page'] for row in results],
+            [name.split(':')[1] for name in JINJA2_VIEWS],
+        )
+        for row in results:
+            with self.subTest(page=row['page']):
+                self.assertGreater(row['jinja2']['mean_ms'], 0)
+                self.assertGreater(row['django']['mean_ms'], 0)
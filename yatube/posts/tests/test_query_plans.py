@@ -0,0 +1,146 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, HeavyAuthor, Post
+
+User = get_user_model()
+
+# Полный проход по таблице и сортировка во временном B-дереве.
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?!.*USING (COVERING )?INDEX)')
+TEMP_SORT = 'USE TEMP B-TREE'
+# Проход по таблице или по всему индексу, без поиска по ключу.
+ANY_SCAN = re.compile(r'^SCAN (\w+)')
+
+# Маленькие служебные таблицы, которые можно читать целиком.
+SMALL_TABLES = ('django_content_type', 'auth_permission')
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@override_settings(
+    NUMBERED_PAGINATION_LIMIT=2, NUM_OF_POST=2, NUM_OF_COMMENTS=2
+)
+class QueryPlanTests(TestCase):
+    """Запросы представлений читают таблицы по индексам.
+
+    Для каждого SELECT, выполненного при открытии страницы, берется
+    EXPLAIN QUERY PLAN. Тест падает, если в плане есть полный проход
+    по таблице или сортировка во временном B-дереве.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {index}', author=cls.author, group=cls.group
+            )
+            for index in range(3)
+        ]
+        cls.post = cls.posts[0]
+        for index in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {index}'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def pages(self):
+        username = self.author.username
+        pages = []
+        for name, kwargs in (
+            ('posts:index', {}),
+            ('posts:group_list', {'slug': self.group.slug}),
+            ('posts:profile', {'username': username}),
+            ('posts:post_detail', {'post_id': self.post.pk}),
+            ('posts:follow_index', {}),
+            ('posts:api_index', {}),
+            ('posts:api_group_list', {'slug': self.group.slug}),
+            ('posts:api_profile', {'username': username}),
+            ('posts:api_follow_index', {}),
+        ):
+            url = reverse(name, kwargs=kwargs)
+            pages.append(url)
+            context = self.client.get(url).context or {}
+            page = context.get('comments') or context.get('page_obj')
+            cursor = getattr(page, 'next_cursor', None)
+            if cursor:
+                pages.append(f'{url}?after={cursor}')
+                pages.append(f'{url}?before={cursor}')
+        return pages
+
+    def scans_table(self, step, strict=False):
+        match = (ANY_SCAN if strict else FULL_SCAN).search(step)
+        return bool(match) and match.group(1) in self.tables
+
+    def assert_plans(self, urls, strict=False):
+        """С strict запрещен и проход по индексу: ленты подписок
+        читаются только поиском по ключу."""
+        self.tables = set(connection.introspection.table_names())
+        for url in urls:
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                if any(f'"{table}"' in sql for table in SMALL_TABLES):
+                    continue
+                plan = query_plan(sql)
+                with self.subTest(url=url, sql=sql, plan=plan):
+                    bad = [
+                        step for step in plan
+                        if TEMP_SORT in step
+                        or self.scans_table(step, strict)
+                    ]
+                    self.assertEqual(bad, [])
+
+    def test_feed_queries_use_indexes(self):
+        """Ленты, пост и API не сканируют таблицы и не сортируют."""
+        pages = self.pages()
+        self.assertEqual(
+            sum('?after=' in url for url in pages), 5
+        )
+        self.assert_plans(pages)
+
+    def test_heavy_author_follow_feed(self):
+        """Лента через Follow для автора без раскладки."""
+        HeavyAuthor.objects.create(author=self.author)
+        url = reverse('posts:follow_index')
+        cursor = self.client.get(url).context['page_obj'].next_cursor
+        self.assert_plans([
+            url,
+            f'{url}?after={cursor}',
+            f'{url}?before={cursor}',
+            reverse('posts:api_follow_index'),
+        ], strict=True)
+
+    def test_follow_feed_without_scans(self):
+        """Лента подписок из TimelineEntry не проходит по индексам
+        целиком."""
+        url = reverse('posts:follow_index')
+        cursor = self.client.get(url).context['page_obj'].next_cursor
+        self.assert_plans([
+            url,
+            f'{url}?after={cursor}',
+            reverse('posts:api_follow_index'),
+        ], strict=True)
@@ -0,0 +1,154 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts import search
+from posts.models import Group, Post, SearchTerm
+from posts.tests.utils import run_on_commit
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Кулинария',
+            slug='cooking',
+            description='Рецепты выпечки',
+        )
+        cls.cake = Post.objects.create(
+            text='Пирог с яблоками и корицей',
+            author=cls.author,
+            group=cls.group,
+        )
+        cls.cakes = Post.objects.create(
+            text='Пирог, пирог и еще раз пирог',
+            author=cls.author,
+        )
+        cls.travel = Post.objects.create(
+            text='Поездка на море',
+            author=cls.author,
+        )
+
+    def test_search(self):
+        """Поиск находит посты со всеми словами запроса."""
+        cases = {
+            'пирог': {self.cake.id, self.cakes.id},
+            'Пирог яблоками': {self.cake.id},
+            'море': {self.travel.id},
+            'выпечки': {self.cake.id},
+            'самолет': set(),
+            '': set(),
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(set(search.search(query)), expected)
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при изменении и удалении постов и групп."""
+        post = Post.objects.create(text='Горный поход', author=self.author)
+        self.assertEqual(search.search('поход'), [post.id])
+        post.text = 'Речной сплав'
+        post.save()
+        self.assertEqual(search.search('поход'), [])
+        self.assertEqual(search.search('сплав'), [post.id])
+        post.delete()
+        self.assertEqual(search.search('сплав'), [])
+        group = Group.objects.get(pk=self.group.pk)
+        group.description = 'Домашние рецепты'
+        with run_on_commit():
+            group.save()
+        self.assertEqual(search.search('выпечки'), [])
+        self.assertEqual(search.search('домашние'), [self.cake.id])
+
+    def test_group_save_without_changes(self):
+        """Группа переиндексирует посты только при изменении названия
+        или описания и сбрасывает кеш только при изменении полей,
+        которые выводятся на страницах."""
+        cases = (
+            ({}, False, False),
+            ({'slug': 'baking'}, False, True),
+            ({'title': 'Выпечка'}, True, True),
+        )
+        for changes, reindexed, bumped in cases:
+            with self.subTest(changes=changes):
+                group = Group.objects.get(pk=self.group.pk)
+                for name, value in changes.items():
+                    setattr(group, name, value)
+                with mock.patch(
+                    'posts.search.index_group_posts'
+                ) as index, mock.patch(
+                    'posts.cache.bump_all_feeds'
+                ) as bump:
+                    with run_on_commit():
+                        group.save()
+                self.assertEqual(index.called, reindexed)
+                self.assertEqual(bump.called, bumped)
+        with mock.patch(
+            'posts.search.index_group_posts'
+        ) as index, mock.patch('posts.cache.bump_all_feeds') as bump:
+            with run_on_commit():
+                Group.objects.create(title='Новая', slug='new')
+        index.assert_not_called()
+        bump.assert_not_called()
+
+    def test_search_page(self):
+        """Страница поиска выводит найденные посты."""
+        response = Client().get(reverse('posts:search'), {'q': 'море'})
+        self.assertEqual(response.context['query'], 'море')
+        self.assertEqual(list(response.context['page_obj']), [self.travel])
+
+    @override_settings(SEARCH_MAX_RESULTS=1)
+    def test_admin_search(self):
+        """Поиск в админке находит все посты, лучшие совпадения
+        первыми."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        client = Client()
+        client.force_login(admin)
+        url = reverse('admin:posts_post_changelist')
+        cases = {
+            'пирог': [self.cakes, self.cake],
+            'пирог корицей': [self.cake],
+            'самолет': [],
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                response = client.get(url, {'q': query})
+                self.assertEqual(
+                    list(response.context['cl'].result_list), expected
+                )
+        response = client.get(url, {'q': 'пирог', 'o': '2'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.cake, self.cakes]
+        )
+
+    def test_rebuild_command(self):
+        """Команда rebuild_search_index восстанавливает индекс."""
+        Post.objects.filter(pk=self.travel.pk).update(text='Поездка в горы')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search.search('горы'), [self.travel.id])
+
+
+@override_settings(SEARCH_BACKEND='inverted')
+class InvertedIndexSearchTests(SearchTests):
+    """Те же проверки для обратного индекса SearchTerm."""
+
+    def test_terms_stored(self):
+        """Слова постов сохраняются в SearchTerm с весами."""
+        self.assertEqual(
+            SearchTerm.objects.get(post=self.cakes, term='пирог').weight, 3
+        )
+
+    def test_ranking(self):
+        """Посты с большим числом совпадений идут первыми."""
+        self.assertEqual(
+            search.search('пирог'), [self.cakes.id, self.cake.id]
+        )
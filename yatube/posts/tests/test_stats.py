@@ -0,0 +1,127 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Follow, Post, UserStats
+from posts.tests.utils import run_on_commit
+
+User = get_user_model()
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth_author')
+        cls.reader = User.objects.create_user(username='auth_reader')
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Счетчик постов меняется при создании и удалении поста."""
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        Post.objects.create(text='Второй пост', author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        Post.objects.filter(author=self.author).delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_follow_counters(self):
+        """Счетчики подписок меняются при подписке и отписке,
+        в том числе каскадной."""
+        reader = User.objects.create_user(username='auth_follower')
+        Follow.objects.create(user=reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(reader).following_count, 1)
+        reader.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+
+    def test_follower_profile_refreshed(self):
+        """Подписка и отписка обновляют закешированный профиль
+        подписчика."""
+        cache.clear()
+        page = reverse('posts:profile', kwargs={'username': self.reader})
+        self.assertContains(self.guest_client.get(page), 'подписок: 0')
+        with run_on_commit():
+            follow = Follow.objects.create(
+                user=self.reader, author=self.author
+            )
+        self.assertContains(self.guest_client.get(page), 'подписок: 1')
+        with run_on_commit():
+            follow.delete()
+        self.assertContains(self.guest_client.get(page), 'подписок: 0')
+
+    def test_recount_command(self):
+        """Команда recount исправляет расхождения счетчиков."""
+        UserStats.objects.filter(user=self.author).update(posts_count=10)
+        UserStats.objects.filter(user=self.reader).delete()
+        call_command('recount', stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+
+    def test_pages_without_count_queries(self):
+        """Страницы поста и профиля не выполняют COUNT."""
+        pages_names = (
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': self.post.id}
+            ),
+            reverse(
+                'posts:profile',
+                kwargs={'username': self.author}
+            ),
+        )
+        for page in pages_names:
+            with self.subTest(page=page):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(page)
+                self.assertContains(response, 'Всего постов')
+                for query in queries:
+                    self.assertNotIn('COUNT(', query['sql'])
+
+    def test_missing_stats_row(self):
+        """Страницы и счетчики работают для пользователя без строки
+        счетчиков, созданного через bulk_create."""
+        User.objects.bulk_create([User(username='auth_bulk')])
+        user = User.objects.get(username='auth_bulk')
+        post = Post.objects.create(text='Пост', author=user)
+        self.assertEqual(self.stats(user).posts_count, 1)
+        UserStats.objects.filter(user=user).delete()
+        pages_names = (
+            reverse('posts:post_detail', kwargs={'post_id': post.id}),
+            reverse('posts:profile', kwargs={'username': user}),
+        )
+        for views in ((), ('posts:profile', 'posts:post_detail')):
+            for page in pages_names:
+                with self.subTest(views=views, page=page):
+                    cache.clear()
+                    UserStats.objects.filter(user=user).delete()
+                    with self.settings(JINJA2_VIEWS=views):
+                        response = self.guest_client.get(page)
+                    self.assertContains(response, 'Всего постов')
+                    self.assertEqual(self.stats(user).posts_count, 1)
+
+    def test_counters_in_write_transaction(self):
+        """Ошибка обновления счетчиков отменяет саму запись."""
+        with mock.patch(
+            'posts.stats.change', side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                Post.objects.create(text='Пост', author=self.reader)
+            with self.assertRaises(DatabaseError):
+                Follow.objects.create(user=self.reader, author=self.author)
+        self.assertFalse(Post.objects.filter(author=self.reader).exists())
+        self.assertFalse(Follow.objects.filter(user=self.reader).exists())
@@ -0,0 +1,153 @@
+import shutil
+import tempfile
+from concurrent.futures import Future
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from posts import thumbnails
+from posts.cache import article_stats, render_article
+from posts.models import Post
+from posts.thumbnails import (generate, get_cached_thumbnail,
+                              prefetch_thumbnails, remember)
+
+from .utils import run_on_commit
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cls.user = User.objects.create_user(username='auth')
+        cls.posts = [
+            Post.objects.create(
+                text='Тестовый текст',
+                author=cls.user,
+                image=SimpleUploadedFile(
+                    name='small.gif',
+                    content=small_gif,
+                    content_type='image/gif'
+                )
+            )
+            for _ in range(3)
+        ]
+        cls.post = cls.posts[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_render_does_not_generate_thumbnail(self):
+        """Без готовой миниатюры рендер получает исходную картинку."""
+        geometry, options = settings.THUMBNAIL_GEOMETRIES[0]
+        self.assertEqual(
+            get_cached_thumbnail(self.post.image, geometry, **options),
+            self.post.image
+        )
+
+    def test_pregenerated_thumbnail_is_used(self):
+        """После генерации рендер получает готовую миниатюру."""
+        remember(generate(self.post.image.name))
+        for geometry, options in settings.THUMBNAIL_GEOMETRIES:
+            with self.subTest(geometry=geometry):
+                thumbnail = get_cached_thumbnail(
+                    self.post.image, geometry, **options
+                )
+                self.assertNotEqual(thumbnail.url, self.post.image.url)
+                self.assertEqual(
+                    list(thumbnail.size), list(map(int, geometry.split('x')))
+                )
+
+    def test_prefetch_thumbnails_for_page(self):
+        """Миниатюры страницы находятся одним обращением к кешу, а рендер
+        больше не обращается к нему."""
+        for post in self.posts[1:]:
+            remember(generate(post.image.name))
+        posts = list(Post.objects.all())
+        with mock.patch.object(
+            cache, 'get_many', wraps=cache.get_many
+        ) as get_many, self.assertNumQueries(0):
+            prefetch_thumbnails(posts)
+        self.assertEqual(get_many.call_count, 1)
+        geometry, options = settings.THUMBNAIL_GEOMETRIES[0]
+        with mock.patch.object(cache, 'get') as get, \
+                mock.patch.object(thumbnails, 'schedule'):
+            found = {
+                post: get_cached_thumbnail(post.image, geometry, **options)
+                for post in posts
+            }
+        get.assert_not_called()
+        for post, thumbnail in found.items():
+            with self.subTest(post=post.image.name):
+                generated = post.pk != self.post.pk
+                self.assertEqual(thumbnail != post.image, generated)
+
+    def test_missing_thumbnail_scheduled_for_post(self):
+        """Недостающая миниатюра ставится в очередь с id поста."""
+        geometry, options = settings.THUMBNAIL_GEOMETRIES[0]
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            get_cached_thumbnail(self.post.image, geometry, **options)
+        schedule.assert_called_once_with(self.post.image.name, self.post.pk)
+
+    def test_ready_thumbnails_bump_feeds(self):
+        """Готовые миниатюры сохраняются, а ленты поста сбрасываются."""
+        future = Future()
+        future.set_result(generate(self.post.image.name))
+        with mock.patch('posts.cache.bump_feed') as bump_feed:
+            with run_on_commit():
+                thumbnails.thumbnails_ready(
+                    self.post.image.name, self.post.pk, future
+                )
+        bump_feed.assert_any_call('index_feed', 'all')
+        bump_feed.assert_any_call('profile_feed', self.user.username)
+        geometry, options = settings.THUMBNAIL_GEOMETRIES[0]
+        self.assertNotEqual(
+            get_cached_thumbnail(self.post.image, geometry, **options),
+            self.post.image,
+        )
+
+    def test_fallback_fragment_not_cached(self):
+        """Фрагмент поста с исходной картинкой не кешируется."""
+        with mock.patch.object(thumbnails, 'schedule'):
+            for _ in range(2):
+                render_article(Post.objects.get(pk=self.post.pk))
+        self.assertEqual(article_stats()['misses'], 2)
+        remember(generate(self.post.image.name))
+        for _ in range(2):
+            render_article(Post.objects.get(pk=self.post.pk))
+        self.assertEqual(article_stats()['hits'], 1)
+
+    def test_force_regenerates(self):
+        """С force миниатюры создаются заново, а не берутся из хранилища."""
+        geometry, options = settings.THUMBNAIL_GEOMETRIES[0]
+        remember(generate(self.post.image.name))
+        thumbnail = get_cached_thumbnail(self.post.image, geometry, **options)
+        path = thumbnail.storage.path(thumbnail.name)
+        with open(path, 'wb') as file_:
+            file_.write(b'broken')
+        generate(self.post.image.name)
+        with open(path, 'rb') as file_:
+            self.assertEqual(file_.read(), b'broken')
+        generate(self.post.image.name, force=True)
+        with open(path, 'rb') as file_:
+            self.assertNotEqual(file_.read(), b'broken')
@@ -0,0 +1,123 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from posts.models import Follow, HeavyAuthor, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth_author')
+        cls.reader = User.objects.create_user(username='auth_reader')
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow_page(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты."""
+        self.reader_client.get(
+            reverse(
+                'posts:profile_follow',
+                kwargs={'username': self.author}
+            )
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.reader, post=self.post
+            ).exists()
+        )
+        self.assertEqual(self.follow_page(), [self.post])
+
+    def test_new_post_fans_out(self):
+        """Новый пост попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(self.follow_page(), [post, self.post])
+
+    def test_unfollow_cleans_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.reader_client.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': self.author}
+            )
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        self.assertEqual(self.follow_page(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_heavy_author_fallback(self):
+        """Посты авторов с большим числом подписчиков читаются через
+        Follow, без раскладки по лентам."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(
+            HeavyAuthor.objects.filter(author=self.author).exists()
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.follow_page(), [post, self.post])
+
+    @override_settings(NUM_OF_POST=2)
+    def test_heavy_author_merge_pages(self):
+        """Посты нескольких авторов сливаются по дате и id, курсоры
+        листают ленту в обе стороны."""
+        now = timezone.now()
+        authors = [self.author] + [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(2)
+        ]
+        for author in authors:
+            Follow.objects.create(user=self.reader, author=author)
+        HeavyAuthor.objects.create(author=authors[1])
+        for number in range(7):
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=authors[number % 3],
+                pub_date=now - timedelta(minutes=number // 2),
+            )
+        expected = list(
+            Post.objects.filter(
+                author__in=authors
+            ).order_by('-pub_date', '-id')
+        )
+        url = reverse('posts:follow_index')
+        pages = []
+        query = ''
+        while True:
+            page_obj = self.reader_client.get(url + query).context['page_obj']
+            pages.append(list(page_obj))
+            if not page_obj.has_next():
+                break
+            query = f'?after={page_obj.next_cursor}'
+        self.assertEqual(sum(pages, []), expected)
+        page_obj = self.reader_client.get(
+            f'{url}?before={page_obj.previous_cursor}'
+        ).context['page_obj']
+        self.assertEqual(list(page_obj), pages[-2])
+
+    def test_rebuild_timeline_command(self):
+        """Команда rebuild_timeline восстанавливает ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timeline', stdout=StringIO())
+        self.assertEqual(self.follow_page(), [self.post])
@@ -8,7 +8,9 @@ from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
-from posts.models import Follow, Group, Post
+from posts import stats
+from posts.models import Comment, Follow, Group, Post
+from posts.tests.utils import run_on_commit
 
 User = get_user_model()
 
@@ -202,7 +204,7 @@ class PostsPagesTests(TestCase):
         response_first = self.authorized_client.get(
             reverse('posts:index')
         )
-        Post.objects.all().delete()
+        Post.objects.update(text='Текст без сигналов')
         response_second = self.authorized_client.get(
             reverse('posts:index')
         )
@@ -210,9 +212,43 @@ class PostsPagesTests(TestCase):
             response_first.content,
             response_second.content
         )
-        cache.clear()
+        with run_on_commit():
+            Post.objects.all().delete()
+        response_third = self.authorized_client.get(
+            reverse('posts:index')
+        )
+        self.assertNotEqual(
+            response_first.content,
+            response_third.content
+        )
         self.assertEqual(Post.objects.count(), settings.ZERO_POST)
 
+    def test_feed_cache_invalidated_by_new_post(self):
+        """Новый пост сразу появляется в кешированных лентах."""
+        pages_names = (
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': self.group.slug}
+            ),
+            reverse(
+                'posts:profile',
+                kwargs={'username': self.user}
+            ),
+        )
+        for page in pages_names:
+            self.guest_client.get(page)
+        with run_on_commit():
+            post = Post.objects.create(
+                text='Свежий пост',
+                group=self.group,
+                author=self.user,
+            )
+        for page in pages_names:
+            with self.subTest(page=page):
+                response = self.guest_client.get(page)
+                self.assertIn(post, response.context['page_obj'])
+
 
 class PostsPaginatorViewsTests(TestCase):
     @classmethod
@@ -236,8 +272,11 @@ class PostsPaginatorViewsTests(TestCase):
             ])
             for post_plus in range(settings.TOTAL_POSTS)
         ]
+        # bulk_create не отправляет сигналы, счетчики пересчитываются.
+        stats.recount()
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -269,6 +308,44 @@ class PostsPaginatorViewsTests(TestCase):
                         posts_on_page
                     )
 
+    @override_settings(NUMBERED_PAGINATION_LIMIT=settings.THREE_POST_PAGE)
+    def test_cursor_pages(self):
+        """Большие ленты листаются курсором ?after= и ?before=."""
+        pages_names = (
+            reverse('posts:index'),
+            reverse(
+                'posts:profile',
+                kwargs={'username': self.user}
+            ),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': self.group.slug}
+            )
+        )
+        for page in pages_names:
+            with self.subTest(page=page):
+                first_page = self.authorized_client.get(
+                    page
+                ).context['page_obj']
+                self.assertTrue(first_page.is_cursor)
+                self.assertEqual(len(first_page), settings.TEN_POST_PAGE)
+                self.assertFalse(first_page.has_previous())
+                second_page = self.authorized_client.get(
+                    page, {'after': first_page.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second_page), settings.THREE_POST_PAGE)
+                self.assertFalse(second_page.has_next())
+                self.assertFalse(
+                    set(first_page.object_list)
+                    & set(second_page.object_list)
+                )
+                back_page = self.authorized_client.get(
+                    page, {'before': second_page.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    back_page.object_list, first_page.object_list
+                )
+
 
 class FollowViewsTest(TestCase):
     @classmethod
@@ -358,3 +435,50 @@ class FollowViewsTest(TestCase):
         )
         post_object = response.context['page_obj']
         self.assertNotIn(post, post_object)
+
+
+class PostDetailQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(
+            username='auth',
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            description='Тестовое описание',
+            slug='test-slug',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            group=cls.group,
+            author=cls.user,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.url = reverse(
+            'posts:post_detail',
+            kwargs={'post_id': self.post.id}
+        )
+
+    def test_post_detail_queries_do_not_grow(self):
+        """Число запросов post_detail не зависит от числа комментариев."""
+        # Валидаторы ETag, пост с автором и группой, комментарии.
+        with self.assertNumQueries(3):
+            self.guest_client.get(self.url)
+        for number in range(settings.NUM_OF_COMMENTS + 5):
+            commentator = User.objects.create(username=f'user{number}')
+            Comment.objects.create(
+                post=self.post,
+                author=commentator,
+                text=f'Комментарий {number}',
+            )
+        with self.assertNumQueries(3):
+            response = self.guest_client.get(self.url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), settings.NUM_OF_COMMENTS)
+        response = self.guest_client.get(
+            self.url, {'after': comments.next_cursor}
+        )
+        self.assertEqual(len(response.context['comments']), 5)
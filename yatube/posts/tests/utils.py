@@ -0,0 +1,17 @@
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def run_on_commit():
+    """Выполняет колбэки on_commit, добавленные внутри блока.
+
+    TestCase не фиксирует транзакцию, поэтому без этого колбэки
+    в тестах не вызываются.
+    """
+    start = len(connection.run_on_commit)
+    yield
+    while len(connection.run_on_commit) > start:
+        _, callback = connection.run_on_commit.pop(start)
+        callback()
@@ -0,0 +1,151 @@
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from sorl.thumbnail import delete, get_thumbnail
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import deserialize_image_file, serialize_image_file
+
+from .models import Post
+from .signals import bump_post_feeds
+
+_executor = None
+
+
+def init_worker():
+    """Готовит процесс пула: Django и собственные соединения с БД."""
+    django.setup()
+    connections.close_all()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            initializer=init_worker,
+        )
+    return _executor
+
+
+def thumbnail_key(name, geometry, options):
+    """Ключ записи о готовой миниатюре в кеше Django."""
+    options = ','.join(
+        f'{option}={value}' for option, value in sorted(options.items())
+    )
+    digest = hashlib.md5(f'{name}|{geometry}|{options}'.encode()).hexdigest()
+    return f'thumbnail:{digest}'
+
+
+def generate(name, force=False):
+    """Создает миниатюры картинки для всех THUMBNAIL_GEOMETRIES.
+
+    Возвращает записи о миниатюрах для кеша Django: процесс пула
+    может не делить кеш с веб-процессом, поэтому их сохраняет
+    вызывающий через remember. С force миниатюры удаляются из
+    хранилища sorl и создаются заново.
+    """
+    if force:
+        delete(name, delete_file=False)
+    entries = {}
+    for geometry, options in settings.THUMBNAIL_GEOMETRIES:
+        thumbnail = get_thumbnail(name, geometry, **options)
+        # Картинку не удалось прочитать: записи нет, рендер покажет
+        # исходную картинку.
+        if thumbnail.size is not None:
+            entries[thumbnail_key(name, geometry, options)] = (
+                serialize_image_file(thumbnail)
+            )
+    return entries
+
+
+def remember(entries):
+    """Сохраняет записи о готовых миниатюрах для рендера."""
+    cache.set_many(entries, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+
+
+def thumbnails_ready(name, post_id, future):
+    """Сохраняет готовые миниатюры и сбрасывает ленты с постом.
+
+    Фрагмент поста с исходной картинкой не кешируется, а страницы
+    лент кешируются целиком, поэтому их версии сдвигаются.
+    """
+    cache.delete(f'thumbnail_pending:{name}')
+    if future.exception() is not None:
+        return
+    remember(future.result())
+    if post_id is None:
+        return
+    post = Post.objects.filter(pk=post_id).only(
+        'author_id', 'group_id'
+    ).first()
+    if post is not None:
+        bump_post_feeds(post, {post.group_id})
+
+
+def schedule(name, post_id=None):
+    """Ставит генерацию миниатюр в пул процессов после коммита."""
+    if not cache.add(f'thumbnail_pending:{name}', 1, 60):
+        return
+
+    def submit():
+        future = get_executor().submit(generate, name)
+        future.add_done_callback(done)
+
+    def done(future):
+        try:
+            thumbnails_ready(name, post_id, future)
+        finally:
+            # Колбэк выполняется в служебном потоке пула, соединение
+            # с БД этого потока больше не понадобится.
+            connections.close_all()
+
+    transaction.on_commit(submit)
+
+
+def prefetch_thumbnails(posts):
+    """Находит миниатюры постов одним обращением к кешу.
+
+    Вызывается для постов страницы, чьих фрагментов нет в кеше.
+    Результат сохраняется в картинке поста, и get_cached_thumbnail
+    больше не обращается к кешу.
+    """
+    images = [post.image for post in posts if post.image]
+    keys = {
+        image: [
+            thumbnail_key(image.name, geometry, options)
+            for geometry, options in settings.THUMBNAIL_GEOMETRIES
+        ]
+        for image in images
+    }
+    if not keys:
+        return
+    found = cache.get_many([key for names in keys.values() for key in names])
+    for image, names in keys.items():
+        image.prefetched_thumbnails = {key: found.get(key) for key in names}
+
+
+def get_cached_thumbnail(file_, geometry, **options):
+    """Готовая миниатюра или исходная картинка, если миниатюры нет.
+
+    Картинка не декодируется во время рендера: недостающие миниатюры
+    ставятся в очередь на генерацию, а картинка помечается, чтобы
+    фрагмент поста с ней не попал в кеш.
+    """
+    if not file_:
+        return None
+    key = thumbnail_key(file_.name, geometry, options)
+    prefetched = getattr(file_, 'prefetched_thumbnails', {})
+    if key in prefetched:
+        value = prefetched[key]
+    else:
+        value = cache.get(key)
+    if value is None:
+        file_.thumbnail_pending = True
+        instance = getattr(file_, 'instance', None)
+        schedule(file_.name, getattr(instance, 'pk', None))
+        return file_
+    return deserialize_image_file(value)
@@ -0,0 +1,268 @@
+import heapq
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Count
+
+from . import counts
+from .models import Follow, HeavyAuthor, Post, TimelineEntry, UserStats
+from .utils import (CursorPaginator, bulk_batch_size, get_cursor_page,
+                    get_padginator)
+
+# Авторов в одном UNION ALL: SQLite ограничивает число частей составного
+# SELECT и параметров запроса.
+MERGE_CHUNK = 200
+
+
+def is_heavy_author(author_id):
+    """Проверяет, раскладываются ли посты автора по лентам."""
+    if HeavyAuthor.objects.filter(author_id=author_id).exists():
+        return True
+    if UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists():
+        HeavyAuthor.objects.get_or_create(author_id=author_id)
+        return True
+    return False
+
+
+def feed_followers(author_id):
+    """Подписчики, в ленты которых раскладываются посты автора."""
+    if is_heavy_author(author_id):
+        return []
+    return list(
+        Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True)
+    )
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора.
+
+    Возвращает id подписчиков, в ленты которых попал пост.
+    """
+    followers = feed_followers(post.author_id)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.id,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in followers
+        ),
+        batch_size=bulk_batch_size(
+            TimelineEntry, settings.TIMELINE_BATCH_SIZE
+        ),
+        ignore_conflicts=True,
+    )
+    return followers
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика все посты автора."""
+    if is_heavy_author(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts.iterator()
+        ),
+        batch_size=bulk_batch_size(
+            TimelineEntry, settings.TIMELINE_BATCH_SIZE
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def cleanup(user_id, author_id):
+    """Убирает из ленты подписчика посты автора."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def _copy_follows(user_ids=None):
+    """Заполняет ленты одним INSERT ... SELECT по Follow и Post.
+
+    Строки не проходят через Python, поэтому пересборка не зависит
+    от числа подписок и постов так сильно, как backfill по авторам.
+    """
+    def column(model, name):
+        return model._meta.get_field(name).column
+
+    sql = (
+        'INSERT INTO {entry} ({entry_user}, {entry_post}, {entry_author}, '
+        '{entry_date}) '
+        'SELECT follow.{follow_user}, post.{post_id}, post.{post_author}, '
+        'post.{post_date} '
+        'FROM {follow} follow '
+        'INNER JOIN {post} post '
+        'ON post.{post_author} = follow.{follow_author} '
+        'WHERE NOT EXISTS (SELECT 1 FROM {heavy} heavy '
+        'WHERE heavy.{heavy_author} = follow.{follow_author})'
+    ).format(
+        entry=TimelineEntry._meta.db_table,
+        entry_user=column(TimelineEntry, 'user'),
+        entry_post=column(TimelineEntry, 'post'),
+        entry_author=column(TimelineEntry, 'author'),
+        entry_date=column(TimelineEntry, 'pub_date'),
+        follow=Follow._meta.db_table,
+        follow_user=column(Follow, 'user'),
+        follow_author=column(Follow, 'author'),
+        post=Post._meta.db_table,
+        post_id=column(Post, 'id'),
+        post_author=column(Post, 'author'),
+        post_date=column(Post, 'pub_date'),
+        heavy=HeavyAuthor._meta.db_table,
+        heavy_author=column(HeavyAuthor, 'author'),
+    )
+    params = []
+    if user_ids is not None:
+        if not user_ids:
+            return
+        sql += ' AND follow.{} IN ({})'.format(
+            column(Follow, 'user'), ', '.join(['%s'] * len(user_ids))
+        )
+        params = list(user_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+@transaction.atomic
+def rebuild(users=None):
+    """Пересобирает ленты подписок.
+
+    Без списка пользователей пересчитывает и авторов без раскладки.
+    """
+    if users is None:
+        TimelineEntry.objects.all().delete()
+        HeavyAuthor.objects.all().delete()
+        HeavyAuthor.objects.bulk_create(
+            HeavyAuthor(author_id=row['author'])
+            for row in Follow.objects.order_by().values('author').annotate(
+                followers=Count('id')
+            ).filter(followers__gt=settings.TIMELINE_FANOUT_LIMIT)
+        )
+        _copy_follows()
+        return
+    user_ids = [user.pk for user in users]
+    TimelineEntry.objects.filter(user_id__in=user_ids).delete()
+    for start in range(0, len(user_ids), 500):
+        _copy_follows(user_ids[start:start + 500])
+
+
+def follows_heavy_author(user):
+    return HeavyAuthor.objects.filter(author__following__user=user).exists()
+
+
+class AuthorsCursorPaginator(CursorPaginator):
+    """Курсорная лента постов нескольких авторов.
+
+    Ключи (дата, id) каждого автора читаются по индексу
+    (author, -pub_date, -id) не дальше одной страницы, части
+    объединяются через UNION ALL и сливаются в Python. Ни все посты
+    авторов, ни весь индекс pub_date не просматриваются.
+    """
+
+    def __init__(self, queryset, per_page, fields=('pub_date', 'id'),
+                 author_ids=()):
+        super().__init__(queryset, per_page, fields)
+        self.author_ids = list(author_ids)
+
+    def _keys(self, cursor, ascending, limit):
+        def column(name):
+            return Post._meta.get_field(name).column
+
+        date_field, id_field = self.fields
+        date, pk = column(date_field), column(id_field)
+        order = 'ASC' if ascending else 'DESC'
+        seek = ''
+        seek_params = []
+        db = connections[self.queryset.db]
+        if cursor:
+            seek = ' AND ({}, {}) {} (%s, %s)'.format(
+                date, pk, '>' if ascending else '<'
+            )
+            seek_params = [
+                db.ops.adapt_datetimefield_value(cursor[0]), cursor[1]
+            ]
+        part = (
+            f'SELECT * FROM (SELECT {date}, {pk} FROM {Post._meta.db_table} '
+            f'WHERE {column("author")} = %s{seek} '
+            f'ORDER BY {date} {order}, {pk} {order} LIMIT %s)'
+        )
+        keys = []
+        with db.cursor() as db_cursor:
+            for start in range(0, len(self.author_ids), MERGE_CHUNK):
+                authors = self.author_ids[start:start + MERGE_CHUNK]
+                params = []
+                for author_id in authors:
+                    params += [author_id, *seek_params, limit]
+                db_cursor.execute(
+                    ' UNION ALL '.join([part] * len(authors)), params
+                )
+                keys += db_cursor.fetchall()
+        select = heapq.nsmallest if ascending else heapq.nlargest
+        return select(limit, keys)
+
+    def _fetch(self, after, before):
+        id_field = self.fields[1]
+        keys = self._keys(before or after, bool(before), self.per_page + 1)
+        ids = [pk for _, pk in keys]
+        rows = {}
+        for row in self.queryset.filter(id__in=ids).order_by():
+            rows[row[id_field] if isinstance(row, dict) else row.pk] = row
+        return [rows[pk] for pk in ids if pk in rows]
+
+
+def follow_source(user):
+    """Источник ленты подписок: queryset, поля курсора, префикс
+    полей поста и класс курсорного паджинатора.
+
+    Лента читается из TimelineEntry одним проходом по индексу. Если
+    пользователь подписан на автора без раскладки, посты авторов
+    сливаются по их индексам в AuthorsCursorPaginator.
+    """
+    if follows_heavy_author(user):
+        author_ids = list(
+            Follow.objects.filter(user=user).values_list(
+                'author_id', flat=True
+            )
+        )
+        posts = Post.objects.filter(author_id__in=author_ids)
+        paginator_class = partial(
+            AuthorsCursorPaginator, author_ids=author_ids
+        )
+        return posts, ('pub_date', 'id'), '', paginator_class
+    entries = TimelineEntry.objects.filter(user=user)
+    return entries, ('pub_date', 'post_id'), 'post__', CursorPaginator
+
+
+def get_follow_page(user, request):
+    """Страница ленты подписок пользователя."""
+    queryset, fields, prefix, paginator_class = follow_source(user)
+    queryset = queryset.select_related(
+        f'{prefix}author',
+        f'{prefix}group',
+    )
+    if not prefix:
+        return get_cursor_page(
+            queryset, request, fields, paginator_class=paginator_class
+        )
+    count, exact = counts.get_count('follow', user.pk, queryset)
+    page_obj = get_padginator(
+        queryset, request, fields=fields, count=count, approximate=not exact
+    )
+    page_obj.object_list = [entry.post for entry in page_obj]
+    return page_obj
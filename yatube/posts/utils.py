@@ -1,10 +1,237 @@
+import base64
+import binascii
+
 from django.conf import settings
 from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+
+def bulk_batch_size(model, batch_size, using='default'):
+    """Размер пачки bulk_create, допустимый для базы данных.
+
+    Django 2.2 не ограничивает явный batch_size пределами базы,
+    и в SQLite большие пачки упираются в лимит составного SELECT
+    и числа параметров запроса.
+    """
+    fields = model._meta.concrete_fields
+    return min(
+        batch_size,
+        connections[using].ops.bulk_batch_size(fields, range(batch_size)),
+    )
+
+
+class EstimatedCountPaginator(Paginator):
+    """Паджинатор, который не считает COUNT(*) по большим таблицам.
+
+    Точное число записей считается только до ESTIMATED_COUNT_LIMIT.
+    Дальше для таблицы без фильтров берется оценка из статистики
+    PostgreSQL, а в остальных случаях число записей экстраполируется
+    по плотности первичных ключей среди первых записей выборки, так
+    что пропуски от удалений не завышают оценку.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.ESTIMATED_COUNT_LIMIT
+        count = queryset.order_by()[:limit + 1].count()
+        if count <= limit:
+            return count
+        estimate = None
+        if not queryset.query.where:
+            estimate = self._table_estimate(queryset)
+        if estimate is None:
+            estimate = self._pk_estimate(queryset, limit)
+        return max(estimate, limit + 1)
+
+    def _table_estimate(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] > 0:
+            return int(row[0])
+        return None
+
+    def _pk_estimate(self, queryset, limit):
+        """Оценка по доле занятых ключей среди limit + 1 последних
+        записей выборки."""
+        pks = queryset.order_by('-pk').values_list('pk', flat=True)
+        newest = pks.first()
+        boundary = pks[limit]
+        oldest = queryset.order_by('pk').values_list(
+            'pk', flat=True
+        ).first()
+        return round(
+            (limit + 1) * (newest - oldest + 1) / (newest - boundary + 1)
+        )
+
+
+class CursorPage:
+    """Страница ленты, полученная по курсору."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Паджинатор по ключу (дата, id) без OFFSET и COUNT(*).
+
+    Лента сортируется по убыванию ключа, курсор указывает на первую
+    или последнюю запись уже показанной страницы.
+    """
+
+    def __init__(self, queryset, per_page, fields=('pub_date', 'id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.fields = fields
+
+    @cached_property
+    def count(self):
+        """Полное число записей, считается только по требованию."""
+        return self.queryset.count()
+
+    def encode_cursor(self, obj):
+        """Курсор записи: объекта модели или словаря из values()."""
+        date_field, id_field = self.fields
+        if isinstance(obj, dict):
+            date, pk = obj[date_field], obj[id_field]
+        else:
+            date, pk = getattr(obj, date_field), getattr(obj, id_field)
+        value = '{}|{}'.format(date.isoformat(), pk)
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        """Возвращает (дата, id) или None для испорченного курсора."""
+        try:
+            value = base64.urlsafe_b64decode(cursor.encode()).decode()
+            date, pk = value.split('|')
+            date = parse_datetime(date)
+            pk = int(pk)
+        except (binascii.Error, UnicodeError, ValueError):
+            return None
+        if date is None:
+            return None
+        return date, pk
+
+    def _seek(self, cursor, direction):
+        date_field, id_field = self.fields
+        date, pk = cursor
+        return Q(**{f'{date_field}__{direction}': date}) | Q(
+            **{date_field: date, f'{id_field}__{direction}': pk}
+        )
+
+    def _fetch(self, after, before):
+        """Записи страницы и одна лишняя в порядке обхода: по убыванию
+        ключа, а перед курсором before по возрастанию."""
+        date_field, id_field = self.fields
+        queryset = self.queryset
+        if before:
+            queryset = queryset.filter(self._seek(before, 'gt')).order_by(
+                date_field, id_field
+            )
+        else:
+            if after:
+                queryset = queryset.filter(self._seek(after, 'lt'))
+            queryset = queryset.order_by(f'-{date_field}', f'-{id_field}')
+        return list(queryset[:self.per_page + 1])
+
+    def get_page(self, after=None, before=None):
+        """Страница после курсора after, перед курсором before
+        или первая страница ленты.
+        """
+        after = after and self.decode_cursor(after)
+        before = before and self.decode_cursor(before)
+        object_list = self._fetch(after, before)
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if before:
+            object_list.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(after)
+        if not object_list:
+            return CursorPage(object_list, self)
+        return CursorPage(
+            object_list,
+            self,
+            next_cursor=(
+                self.encode_cursor(object_list[-1]) if has_next else None
+            ),
+            previous_cursor=(
+                self.encode_cursor(object_list[0]) if has_previous else None
+            ),
+        )
+
+
+def get_cursor_page(queryset, request, fields=('pub_date', 'id'),
+                    per_page=None, paginator_class=CursorPaginator):
+    """Страница ленты по параметрам ?after= и ?before= запроса."""
+    paginator = paginator_class(
+        queryset, per_page or settings.NUM_OF_POST, fields
+    )
+    return paginator.get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+
 
+def get_padginator(queryset, request, fields=('pub_date', 'id'),
+                   count=None, approximate=False):
+    """Функция паджинатора.
 
-def get_padginator(queryset, request):
-    """Функция паджинатора."""
-    paginator = Paginator(queryset, settings.NUM_OF_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    Небольшие ленты листаются по номерам страниц. Для больших лент
+    и запросов с курсором используется CursorPaginator, поэтому
+    COUNT(*) ограничен NUMBERED_PAGINATION_LIMIT записями, а глубокие
+    страницы не читаются через OFFSET. Если размер ленты уже известен,
+    его можно передать в count, и подсчет не выполняется. Примерное
+    число отмечается флагом approximate, и шаблон не ссылается
+    на последнюю страницу.
+    """
+    if 'after' not in request.GET and 'before' not in request.GET:
+        limit = settings.NUMBERED_PAGINATION_LIMIT
+        if count is None:
+            count = queryset.order_by()[:limit + 1].count()
+        if count <= limit:
+            paginator = Paginator(queryset, settings.NUM_OF_POST)
+            paginator.count = count
+            paginator.approximate = approximate
+            page_number = request.GET.get('page')
+            page_obj = paginator.get_page(page_number)
+            return page_obj
+    return get_cursor_page(queryset, request, fields)
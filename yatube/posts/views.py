@@ -1,31 +1,53 @@
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
-from django.views.decorators.cache import cache_page
 
+from core.backends import template_engine
+
+from . import counts, export, stats
+from .cache import cache_feed, prefetch_articles
+from .conditional import (conditional, post_detail_validators,
+                          profile_validators)
+from .follows import is_following
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post
-from .utils import get_padginator
+from .search import search
+from .thumbnails import prefetch_thumbnails
+from .timeline import get_follow_page
+from .utils import get_cursor_page, get_padginator
 
 User = get_user_model()
 
 
-@cache_page(settings.CACHE_TIMEOUT, key_prefix='index_page')
+@cache_feed('index_feed')
 def index(request):
     """Выводим шаблон главной страницы."""
     posts = Post.objects.select_related(
         'author',
         'group',
     )
-    page_obj = get_padginator(posts, request)
+    count, exact = counts.get_count('index', 'all', posts)
+    page_obj = get_padginator(
+        posts, request, count=count, approximate=not exact
+    )
+    prefetch_articles(page_obj, prefetch_thumbnails)
     context = {
         'page_obj': page_obj
     }
-    return render(request, 'posts/index.html', context)
+    return render(
+        request,
+        'posts/index.html',
+        context,
+        using=template_engine(request),
+    )
 
 
+@cache_feed('group_feed', 'slug')
 def group_posts(request, slug):
     """Выводим шаблон с группами постов."""
     group = get_object_or_404(Group, slug=slug)
@@ -33,43 +55,126 @@ def group_posts(request, slug):
         'author',
         'group',
     )
-    page_obj = get_padginator(posts, request)
+    count, exact = counts.get_count('group', group.pk, posts)
+    page_obj = get_padginator(
+        posts, request, count=count, approximate=not exact
+    )
+    prefetch_articles(page_obj, prefetch_thumbnails)
     context = {
         'group': group,
         'page_obj': page_obj
     }
-    return render(request, 'posts/group_list.html', context)
+    return render(
+        request,
+        'posts/group_list.html',
+        context,
+        using=template_engine(request),
+    )
 
 
+@conditional(profile_validators)
+@cache_feed('profile_feed', 'username')
 def profile(request, username):
     """Выводит шаблон профиля пользователя."""
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
     posts = author.posts.select_related(
         'author',
         'group'
     )
-    page_obj = get_padginator(posts, request)
-    user = request.user
-    following = user.is_authenticated and author.following.filter(
-        user=user
-    ).exists()
+    page_obj = get_padginator(
+        posts, request, count=stats.for_user(author).posts_count
+    )
+    prefetch_articles(page_obj, prefetch_thumbnails)
     context = {
         'author': author,
         'page_obj': page_obj,
-        'following': following
+        'following': is_following(request.user, [author.pk])[author.pk]
     }
-    return render(request, 'posts/profile.html', context)
+    return render(
+        request,
+        'posts/profile.html',
+        context,
+        using=template_engine(request),
+    )
 
 
+@conditional(post_detail_validators)
 def post_detail(request, post_id):
     """Выводим на страницу подробную информацию о посте."""
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        id=post_id
+    )
+    stats.for_user(post.author)
+    comments = get_cursor_page(
+        post.comments.select_related('author'),
+        request,
+        fields=('created', 'id'),
+        per_page=settings.NUM_OF_COMMENTS,
+    )
     form = CommentForm(request.POST or None)
     context = {
         'post': post,
+        'comments': comments,
         'form': form,
     }
-    return render(request, 'posts/post_detail.html', context)
+    return render(
+        request,
+        'posts/post_detail.html',
+        context,
+        using=template_engine(request),
+    )
+
+
+def post_search(request):
+    """Выводим найденные посты, лучшие совпадения первыми."""
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(search(query), settings.NUM_OF_POST)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    posts = Post.objects.select_related(
+        'author',
+        'group',
+    ).in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        posts[post_id] for post_id in page_obj.object_list
+        if post_id in posts
+    ]
+    prefetch_articles(page_obj, prefetch_thumbnails)
+    context = {
+        'query': query,
+        'page_obj': page_obj
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@staff_member_required
+def export_posts(request):
+    """Выгружаем посты в NDJSON потоком, при ?gzip=1 со сжатием."""
+    try:
+        posts = export.filter_posts(
+            group=request.GET.get('group'),
+            author=request.GET.get('author'),
+            since=request.GET.get('since'),
+            until=request.GET.get('until'),
+        )
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+    lines = export.iter_ndjson(posts)
+    if request.GET.get('gzip'):
+        response = StreamingHttpResponse(
+            export.gzip_lines(lines), content_type='application/gzip'
+        )
+        filename = 'posts.ndjson.gz'
+    else:
+        response = StreamingHttpResponse(
+            lines, content_type='application/x-ndjson; charset=utf-8'
+        )
+        filename = 'posts.ndjson'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 
 @login_required
@@ -80,9 +185,8 @@ def post_create(request):
         files=request.FILES or None,
     )
     if form.is_valid():
-        post_create = form.save(commit=False)
-        post_create.author = request.user
-        post_create.save()
+        form.instance.author = request.user
+        post_create = form.save()
         return redirect(
             'posts:profile', post_create.author
         )
@@ -131,16 +235,17 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post = Post.objects.select_related(
-        'author'
-    ).filter(
-        author__following__user=request.user
-    )
-    page_obj = get_padginator(post, request)
+    page_obj = get_follow_page(request.user, request)
+    prefetch_articles(page_obj, prefetch_thumbnails)
     context = {
         'page_obj': page_obj
     }
-    return render(request, 'posts/follow.html', context)
+    return render(
+        request,
+        'posts/follow.html',
+        context,
+        using=template_engine(request),
+    )
 
 
 @login_required
@@ -0,0 +1,76 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.urls import get_script_prefix, get_urlconf, reverse
+from django.utils.timezone import template_localtime
+from jinja2 import Environment, FileSystemBytecodeCache, pass_context
+
+from core.templatetags.user_filters import addclass
+from posts.cache import render_article
+from posts.thumbnails import get_cached_thumbnail
+
+
+@lru_cache(maxsize=4096)
+def _reverse(urlconf, prefix, name, args):
+    return reverse(name, urlconf=urlconf, args=args)
+
+
+def url(name, *args):
+    """Адрес по имени, как тег url.
+
+    Адреса кешируются в процессе по строковым аргументам, поэтому
+    объекты моделей передаются полями, а не целиком.
+    """
+    args = tuple(str(arg) for arg in args)
+    return _reverse(get_urlconf(), get_script_prefix(), name, args)
+
+
+def date(value, arg=None):
+    return defaultfilters.date(template_localtime(value), arg)
+
+
+def linebreaks(value):
+    return defaultfilters.linebreaks_filter(value, autoescape=True)
+
+
+def linebreaksbr(value):
+    return defaultfilters.linebreaksbr(value, autoescape=True)
+
+
+@pass_context
+def article(context, post, **flags):
+    return render_article(
+        post, context.get('request'), using='jinja2', **flags
+    )
+
+
+def environment(**options):
+    """Окружение Jinja2 с помощниками шаблонов Django.
+
+    Скомпилированные шаблоны кешируются в памяти процесса и в
+    JINJA2_BYTECODE_CACHE, чтобы новые процессы не компилировали
+    их заново. Заданный каталог должен существовать и быть доступен
+    только пользователю сервера.
+    """
+    options.setdefault(
+        'bytecode_cache',
+        FileSystemBytecodeCache(settings.JINJA2_BYTECODE_CACHE),
+    )
+    env = Environment(**options)
+    env.globals.update({
+        'url': url,
+        'static': static,
+        'article': article,
+        'thumbnail': get_cached_thumbnail,
+    })
+    env.filters.update({
+        'date': date,
+        'linebreaks': linebreaks,
+        'linebreaksbr': linebreaksbr,
+        'truncatechars': defaultfilters.truncatechars,
+        'urlencode': defaultfilters.urlencode,
+        'addclass': addclass,
+    })
+    return env
@@ -28,11 +28,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -41,7 +44,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -54,17 +58,106 @@ TEMPLATES = [
             ],
         },
     },
+    {
+        'BACKEND': 'core.backends.TimedJinja2',
+        'NAME': 'jinja2',
+        'DIRS': [os.path.join(BASE_DIR, 'jinja2')],
+        'OPTIONS': {
+            'environment': 'yatube.jinja2.environment',
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
 ]
 
+# Представления, которые рендерят шаблоны из jinja2/ вместо templates/.
+JINJA2_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+)
+
+# Каталог скомпилированных шаблонов Jinja2, общий для всех процессов.
+# None — личный каталог пользователя с правами 0700, который Jinja2
+# создает во временной папке и проверяет на владельца.
+JINJA2_BYTECODE_CACHE = None
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Применяются к каждому новому соединению с SQLite: WAL не дает
+# читателям и писателю блокировать друг друга, busy_timeout ждет
+# блокировку вместо ошибки database is locked.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+}
+
+# Пути к копиям БД для чтения через запятую, например
+# DATABASE_REPLICAS=/var/lib/yatube/replica1.sqlite3
+REPLICA_DATABASES = []
+for index, name in enumerate(
+    filter(None, os.environ.get('DATABASE_REPLICAS', '').split(','))
+):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'about:author',
+    'about:tech',
+)
+
+# Представления, после записи в которых клиент закрепляется за основной
+# базой. Служебные записи вроде сессии или last_login не закрепляют.
+REPLICA_PIN_VIEWS = (
+    'posts:post_create',
+    'posts:edit',
+    'posts:add_comment',
+    'posts:profile_follow',
+    'posts:profile_unfollow',
+)
+
+# Модели, которые всегда читаются из основной базы: сессия и
+# пользователь только что вошедшего клиента есть только в ней.
+REPLICA_PRIMARY_MODELS = ('auth', 'sessions', 'core.requestprofile')
+
+REPLICA_PIN_COOKIE = 'primary_pin'
+
+REPLICA_PIN_SECONDS: int = 5
+
+# Срок кеша страниц лент, собранных с реплики: копия может отставать
+# от новой версии ленты, поэтому живет недолго и под своим ключом.
+REPLICA_CACHE_TIMEOUT: int = 30
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -82,6 +175,18 @@ AUTH_PASSWORD_VALIDATORS = [
 
 NUM_OF_POST: int = 10
 
+NUMBERED_PAGINATION_LIMIT: int = 1000
+
+FEED_COUNT_TIMEOUT: int = 60 * 10
+
+FEED_COUNT_PENDING: int = 60
+
+FEED_COUNT_WORKERS: int = 1
+
+ESTIMATED_COUNT_LIMIT: int = 10000
+
+NUM_OF_COMMENTS: int = 20
+
 COEFF_SLICE: int = 15
 
 FIRST_CHAR_POST: int = 15
@@ -92,7 +197,50 @@ TEN_POST_PAGE: int = 10
 
 THREE_POST_PAGE: int = 3
 
-CACHE_TIMEOUT: int = 20
+# Кеш страниц лент; замеры выключают его, чтобы мерить представления.
+FEED_CACHE: bool = True
+
+CACHE_TIMEOUT: int = 60 * 60
+
+FEED_STALE_TIMEOUT: int = 60 * 10
+
+FEED_LOCK_TIMEOUT: int = 30
+
+FEED_LOCK_WAIT: float = 2.0
+
+FEED_LOCK_POLL: float = 0.05
+
+FEED_EARLY_REFRESH_BETA: float = 1.0
+
+ARTICLE_CACHE_TIMEOUT: int = 60 * 60 * 24
+
+FOLLOW_CACHE_TIMEOUT: int = 60 * 60 * 24
+
+SEARCH_BACKEND = 'auto'
+
+SEARCH_MAX_RESULTS: int = 1000
+
+THUMBNAIL_GEOMETRIES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+THUMBNAIL_WORKERS: int = 2
+
+ASGI_THREADS: int = 16
+
+# Server-Timing раскрывает клиентам внутренние тайминги, поэтому
+# по умолчанию отдается только при отладке.
+SERVER_TIMING: bool = DEBUG
+
+PROFILER_KEEP: int = 50
+
+PROFILER_SAMPLE_INTERVAL: float = 0.005
+
+PROFILER_STATS_LINES: int = 40
+
+TIMELINE_FANOUT_LIMIT: int = 10000
+
+TIMELINE_BATCH_SIZE: int = 1000
 
 ZERO_POST: int = 0
 
@@ -125,6 +273,9 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.backends.InstrumentedCache',
+        'OPTIONS': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
     }
 }
@@ -3,6 +3,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import request_metrics
+
 handler403 = 'core.views.permission_denied'
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
@@ -13,6 +15,7 @@ urlpatterns = [
     path('', include('posts.urls', namespace='index')),
     path('about/', include('about.urls', namespace='about')),
     path('admin/', admin.site.urls),
+    path('metrics/', request_metrics, name='request_metrics'),
 ]
 
 if settings.DEBUG: